@@ -0,0 +1,42 @@
+from interpreter import *
+import sys
+
+# Running a program on many inputs.
+# The input is split into records, either one per line or blocks of lines
+# separated by a delimiter line, and the program is run once per record,
+# reading its input items from the lines of the record.
+
+def read_records(lines, delimiter=None):
+    "Split an iterable of lines into records, which are lists of lines."
+    if delimiter is None:
+        for line in lines:
+            yield [line.rstrip('\n')]
+        return
+    record = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if line == delimiter:
+            yield record
+            record = []
+        else:
+            record.append(line)
+    if record:
+        yield record
+
+def run_batch(program, records, delimiter=None):
+    """Run a Program on each record, printing the delimiter after the output
+    of each record if it's given. Errors are reported on STDERR and don't
+    stop the batch. Returns the number of records that failed."""
+    failures = 0
+    for (n, record) in enumerate(records, 1):
+        try:
+            program.run(record)
+        except Exception as error:
+            failures += 1
+            output.flush()
+            print("Error in record {}: {}: {}".format(n, type(error).__name__, error),
+                  file=sys.stderr)
+        if delimiter is not None:
+            output.write(delimiter + "\n")
+    output.flush()
+    return failures
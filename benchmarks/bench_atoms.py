@@ -0,0 +1,32 @@
+"Measure the memory used by atoms in long strings and ranges."
+
+import sys
+import tracemalloc
+
+from common import check
+from utils import *
+
+class DictAtom:
+    "Atoms as they were before they had slots and interning."
+    def __init__(self, type, value):
+        self.type = type
+        self.value = value
+
+def measure(label, build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<32}{:10.1f} MB{:8.1f} bytes/atom".format(label, size / 2**20, size / len(value)))
+    return value
+
+if __name__ == "__main__":
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    text = "".join(chr(32 + i % 95) for i in range(length))
+    print("{} atoms".format(length))
+    measure("string, before", lambda: [DictAtom(AtomType.char, ord(c)) for c in text])
+    string = measure("string, after", lambda: [to_char_atom(c) for c in text])
+    check("string", [atom.value for atom in string], list(map(ord, text)))
+    measure("range, before", lambda: [DictAtom(AtomType.num, n) for n in range(length)])
+    numbers = measure("range, after", lambda: un_range(to_num_atom(length)))
+    check("range", [atom.value for atom in numbers], list(range(length)))
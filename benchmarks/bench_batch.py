@@ -0,0 +1,62 @@
+"Compare running a program on many inputs in batch mode and by reinterpreting it."
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import check, timed
+from interpreter import *
+from bench_fill import fan_out
+
+jellyfish = os.path.join(os.path.dirname(__file__), os.pardir, "jellyfish.py")
+
+def with_input(matrix):
+    "Add an input item to the east of the top left item."
+    return [matrix[0][0] + 'i' + matrix[0][1:]] + matrix[1:]
+
+def reinterpret(matrix, records):
+    values = []
+    for record in records:
+        sys.stdin = io.StringIO("\n".join(record) + "\n")
+        values.append(interpret(matrix))
+    sys.stdin = sys.__stdin__
+    return values
+
+def batch(matrix, records):
+    program = Program(matrix)
+    return [program.run(record) for record in records]
+
+def processes(path, records):
+    return "".join(subprocess.run([sys.executable, jellyfish, path], input="\n".join(record) + "\n",
+                                  stdout=subprocess.PIPE, text=True, check=True).stdout
+                   for record in records)
+
+def batch_process(path, records):
+    return subprocess.run([sys.executable, jellyfish, "--batch", path],
+                          input="".join(record[0] + "\n" for record in records),
+                          stdout=subprocess.PIPE, text=True, check=True).stdout
+
+def run(label, matrix, count, process_count):
+    print(label)
+    records = [[str(n)] for n in range(count)]
+    expected = timed("  reinterpret {} inputs".format(count), reinterpret, matrix, records)
+    check("batch", timed("  batch {} inputs".format(count), batch, matrix, records), expected)
+    with tempfile.NamedTemporaryFile('w', suffix='.jf', delete=False) as source_file:
+        source_file.write("\n".join(matrix))
+    try:
+        text = timed("  {} processes".format(process_count), processes, source_file.name,
+                     records[:process_count])
+        batch_text = timed("  --batch, {} inputs".format(count), batch_process, source_file.name, records)
+        check("--batch", batch_text[:len(text)], text)
+    finally:
+        os.remove(source_file.name)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**4
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    process_count = 100
+    run("Increment", ['>i'], count, process_count)
+    run("Fan-out grid of {0}x{0} cells with an input".format(size), with_input(fan_out(size)),
+        count // 10, process_count)
@@ -0,0 +1,33 @@
+"Compare reading a large numeric matrix as text and from a memory-mapped binary file."
+
+import os
+import random
+import sys
+import tempfile
+
+from common import check, timed
+from print_parse import *
+from vocab import func_defs
+
+def run(side):
+    rng = random.Random(0)
+    rows = [[rng.randrange(10**6) for _ in range(side)] for _ in range(side)]
+    text = "[" + " ".join("[" + " ".join(map(str, row)) + "]" for row in rows) + "]"
+    value = from_python(rows)
+    print("{0}x{0} integers".format(side))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "matrix.bin")
+        timed("  write binary file", write_binary, path, value)
+        check("parse text", timed("  parse text", parse_input, text), value)
+        matrix = timed("  map binary file", parse_input, "@" + path)
+        check("map binary file", matrix, value)
+        check("add 1", timed("  add 1 to mapped matrix", func_defs['+'], to_num_atom(1), matrix),
+              from_python([[n + 1 for n in row] for row in rows]))
+        numbers = [n for row in rows for n in row]
+        check("reshape", timed("  reshape mapped matrix", func_defs['$'], from_python([side // 2, side * 2]), matrix),
+              from_python([numbers[i:i + side*2] for i in range(0, len(numbers), side*2)]))
+        del matrix
+
+if __name__ == "__main__":
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    run(side)
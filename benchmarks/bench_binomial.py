@@ -0,0 +1,43 @@
+"Time ! and C threaded over tables, and compare with dividing full factorials."
+
+import math
+import sys
+
+from common import check, timed
+from vocab import *
+
+def factorial_binomial(x, y):
+    "func_combinations on atoms as it was before the binomial rows."
+    if y < x:
+        return 0
+    return math.factorial(y) // math.factorial(x) // math.factorial(y - x)
+
+def pascal_triangle(rows):
+    return [func_defs['C'](func_defs['r'](to_num_atom(n + 1)), to_num_atom(n)) for n in range(rows)]
+
+def values(atoms):
+    return [atom.value for atom in atoms]
+
+def run(rows, size):
+    print("Pascal's triangle, {} rows".format(rows))
+    expected = timed("  factorials", lambda: [[factorial_binomial(k, n) for k in range(n + 1)] for n in range(rows)])
+    check("C", list(map(values, timed("  C", pascal_triangle, rows))), expected)
+    print("C of {0} with r {0}".format(size))
+    expected = timed("  factorials", lambda: [factorial_binomial(k, size) for k in range(size)])
+    check("C", values(timed("  C", func_defs['C'], func_defs['r'](to_num_atom(size)), to_num_atom(size))), expected)
+    print("C of 3 with {} to {}".format(size // 2, size - 1))
+    expected = timed("  factorials", lambda: [factorial_binomial(3, n) for n in range(size // 2, size)])
+    check("C", values(timed("  C", lambda: [func_defs['C'](to_num_atom(3), to_num_atom(n))
+                                            for n in range(size // 2, size)])), expected)
+    print("! of r {0} with {0}".format(size))
+    expected = timed("  factorials", lambda: [math.factorial(size) // math.factorial(size - k) for k in range(size)])
+    check("!", values(timed("  !", func_defs['!'], func_defs['r'](to_num_atom(size)), to_num_atom(size))), expected)
+    print("! of r {}".format(rows))
+    expected = timed("  factorials", lambda: [math.factorial(n) for n in range(rows)])
+    factorial_table[1:] = []
+    check("!", values(timed("  !", lambda: [func_defs['!'](to_num_atom(n)) for n in range(rows)])), expected)
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    run(rows, size)
@@ -0,0 +1,23 @@
+"Compare parsing with cold and warm starts from the on-disk program cache."
+
+import sys
+import tempfile
+
+from common import check, timed
+from interpreter import *
+from cache import ProgramCache
+from bench_fill import fan_out
+from bench_parse import links, sparse_grid
+
+def run(label, matrix):
+    print(label)
+    with tempfile.TemporaryDirectory() as directory:
+        expected = links(timed("  parse without cache", parse, matrix))
+        check("cold start", links(timed("  cold start", ProgramCache(directory).parse, matrix)), expected)
+        check("warm start", links(timed("  warm start", ProgramCache(directory).parse, matrix)), expected)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    grid_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    run("Fan-out grid of {0}x{0} cells".format(size), fan_out(size))
+    run("Sparse {0}x{0} grid".format(grid_size), sparse_grid(grid_size, 0.002))
@@ -0,0 +1,68 @@
+"Consume permutations, combinations and subsequences lazily, compared with building them as lists."
+
+import functools
+import itertools
+import math
+import sys
+
+import common
+from common import check
+from vocab import *
+
+# Every step also reports its peak memory
+timed = functools.partial(common.timed, memory=True)
+
+def eager_permutations(a):
+    "! as it was before it was lazy."
+    return [list(p) for p in itertools.permutations(a)]
+
+def first_match(permutations):
+    "Find the first permutation that starts with 0 2 and ends in a descent of length 3."
+    for p in permutations:
+        if p[0].value == 0 and p[1].value == 2 and p[-1] < p[-2] < p[-3]:
+            return p
+
+def nth(iterable, index):
+    "The item at index of an iterable, as a list of ints."
+    return list(next(itertools.islice(iterable, index, None)))
+
+def ints(atoms):
+    return [atom.value for atom in atoms]
+
+def run(n, eager_n):
+    num = to_num_atom
+    items = from_python(list(range(n)))
+    print("Permutations of {} items".format(n))
+    perms = timed("  !", func_defs['!'], items)
+    check("# length", timed("  # length", func_defs['#'], perms).value, math.factorial(n))
+    middle = len(perms) // 2
+    check("@ index", ints(timed("  @ index", func_defs['@'], num(middle), perms)),
+          nth(itertools.permutations(range(n)), middle))
+    check("^ take 10", list(map(ints, timed("  ^ take 10", func_defs['^'], num(10), perms))),
+          list(map(list, itertools.islice(itertools.permutations(range(n)), 10))))
+    timed("  / fold with > over the first 10^5", oper_defs['/'](func_defs['>']),
+          func_defs['^'](num(10**5), perms))
+    check("c", timed("  c finds the permutation at 10^5", func_defs['c'], perms[10**5], perms).value, 1)
+    expected = next(list(p) for p in itertools.permutations(range(n))
+                    if p[0] == 0 and p[1] == 2 and p[-1] < p[-2] < p[-3])
+    check("first matching permutation",
+          ints(timed("  first matching permutation", lambda: first_match(perms))), expected)
+    small = from_python(list(range(eager_n)))
+    eager = timed("  first match, {} items, eager".format(eager_n),
+                  lambda: first_match(eager_permutations(small)))
+    check("first match, lazy", timed("  first match, {} items, lazy".format(eager_n),
+                                     lambda: first_match(func_defs['!'](small))), eager)
+    print("Combinations and subsequences of {} items".format(2*n))
+    many = from_python(list(range(2*n)))
+    combs = timed("  C choose {}".format(n), func_defs['C'], num(n), many)
+    check("C @ index", ints(timed("  @ index", func_defs['@'], num(len(combs) // 3), combs)),
+          nth(itertools.combinations(range(2*n), n), len(combs) // 3))
+    subs = timed("  C subsequences", func_defs['C'], many)
+    check("C subsequences @ index", ints(timed("  @ index", func_defs['@'], num(len(subs) // 3), subs)),
+          nth(itertools.chain.from_iterable(itertools.combinations(range(2*n), k) for k in range(2*n + 1)),
+              len(subs) // 3))
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 11
+    eager_n = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    run(n, eager_n)
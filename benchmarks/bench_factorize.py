@@ -0,0 +1,58 @@
+"Factorize ranges element-wise and large semiprimes, and compare with trial division."
+
+import math
+import random
+import sys
+
+from common import check, timed
+from vocab import *
+
+def trial_division(n):
+    "func_factorize as it was before the prime cache."
+    fact = []
+    div = 2
+    while n > 1:
+        if n % div == 0:
+            n //= div
+            fact.append(div)
+        else:
+            div += 1
+    return fact
+
+def random_prime(digits, rng):
+    while True:
+        p = rng.randrange(10**(digits-1), 10**digits)
+        if is_prime(p):
+            return p
+
+def semiprimes(count, small_digits, digits, rng):
+    "Numbers with the given number of digits, with a prime factor of small_digits digits."
+    return [random_prime(small_digits, rng) * random_prime(digits - small_digits, rng)
+            for _ in range(count)]
+
+def values(factorizations):
+    return [[atom.value for atom in factors] for factors in factorizations]
+
+def run(size, old_size):
+    factorize = func_defs['x']
+    print("x r {}".format(size))
+    factors = values(timed("  prime cache", factorize, func_defs['r'](to_num_atom(size))))
+    check("x r", [math.prod(f) for f in factors[1:]], list(range(1, size)))
+    print("x r {}".format(old_size))
+    expected = timed("  trial division", lambda: [trial_division(n) for n in range(1, old_size+1)])
+    factorizations.clear()
+    check("x r", values(timed("  prime cache", factorize, func_defs['r'](to_num_atom(old_size))))[1:],
+          expected[:-1])
+    rng = random.Random(0)
+    for small_digits in [6, 9, 12]:
+        numbers = semiprimes(10, small_digits, 60, rng)
+        print("10 60-digit semiprimes with a {}-digit factor".format(small_digits))
+        factors = values(timed("  prime cache", lambda: [factorize(to_num_atom(n)) for n in numbers]))
+        check("x", [math.prod(f) for f in factors], numbers)
+        check("memoized", values(timed("  memoized", lambda: [factorize(to_num_atom(n)) for n in numbers])),
+              factors)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    old_size = int(sys.argv[2]) if len(sys.argv) > 2 else 2 * 10**4
+    run(size, old_size)
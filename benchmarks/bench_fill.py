@@ -0,0 +1,47 @@
+"Stress parsing and filling on long chains and on grids with a lot of fan-out."
+
+import sys
+
+from common import check, timed
+from interpreter import *
+from compiler import compile_program, max_compiled_cells
+
+def long_chain(length):
+    "A column of increments: the value is the length of the chain."
+    return ['>'] * length + ['0']
+
+def fan_out(size):
+    "A square of additions, where every item is the input of two others."
+    return ['+' * (size-1) + '1'] * (size-1) + ['1']
+
+def recursive_fill(items, pos=(0,0)):
+    "Fill as it was before it was made iterative."
+    item, l_conn, r_conn = items[pos]
+    if item.filled or item.type == ItemType.dummy:
+        return item
+    if item.type != ItemType.data:
+        recursive_fill(items, l_conn.pos)
+        recursive_fill(items, r_conn.pos)
+    fill_item(items, pos)
+    return item
+
+def run(label, matrix, cells, expected=None):
+    "Time the steps on the matrix, whose value is expected, or the one that fill gives."
+    print(label)
+    items = timed("  parse", parse, matrix)
+    corner = timed("  fill", fill, items)
+    if expected is None:
+        expected = corner.evaluate().value
+    check("fill", corner.evaluate().value, expected)
+    item = timed("  recursive fill", recursive_fill, parse(matrix), errors=(RecursionError,))
+    if not isinstance(item, RecursionError):
+        check("recursive fill", item.evaluate().value, expected)
+    if cells <= max_compiled_cells:
+        run_program = timed("  compile", compile_program, parse(matrix))
+        check("compile", run_program().value, expected)
+
+if __name__ == "__main__":
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    run("Chain of {} cells".format(length), long_chain(length), length, length)
+    run("Fan-out grid of {0}x{0} cells".format(size), fan_out(size), size*size)
@@ -0,0 +1,45 @@
+"Fold large lists and matrices with /, and compare with folding item by item."
+
+import random
+import sys
+
+from common import check, timed
+from vocab import *
+
+def item_by_item(f, a):
+    "The fold of / without kernels."
+    items = iter(a)
+    x = next(items)
+    for y in items:
+        x = f(x, y)
+    return x
+
+def run(size, rows):
+    fold = oper_defs['/']
+    rng = random.Random(0)
+    numbers = [to_num_atom(rng.randrange(-1000, 1000)) for _ in range(size)]
+    floats = [to_num_atom(rng.random()) for _ in range(size)]
+    matrix = [[to_num_atom(rng.randrange(100)) for _ in range(8)] for _ in range(rows)]
+    for (label, value) in [("{} ints".format(size), numbers),
+                           ("{} floats".format(size), floats),
+                           ("r {}".format(size), func_defs['r'](to_num_atom(size))),
+                           ("{}x8 matrix".format(rows), matrix)]:
+        print(label)
+        for char in "+*xmM":
+            if char == '*' and value is not floats:
+                continue
+            if char == 'x' and value is floats:
+                continue
+            if value is numbers and size > 10**6 or value is not matrix and size > 10**7:
+                timed("  {}/".format(char), fold(func_defs[char]), value)
+                continue
+            expected = timed("  {}/ item by item".format(char), item_by_item, func_defs[char], value)
+            check("{}/".format(char), timed("  {}/".format(char), fold(func_defs[char]), value), expected)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10**5
+    run(size, rows)
+    print("r {}".format(10**7))
+    check("+/", timed("  +/", oper_defs['/'](func_defs['+']), func_defs['r'](to_num_atom(10**7))).value,
+          10**7 * (10**7 - 1) // 2)
@@ -0,0 +1,56 @@
+"Iterate functions with known periods using \\, with and without cycle detection."
+
+import sys
+
+from common import check, timed
+from vocab import *
+
+def lcg(modulus):
+    "x -> 5x+3 mod modulus, which has period modulus when it's a power of 2."
+    add, mul, mod = func_defs['+'], func_defs['*'], func_defs['|']
+    return lambda x: mod(to_num_atom(modulus), add(to_num_atom(3), mul(to_num_atom(5), x)))
+
+def rotate(x):
+    "Rotate a list by one item, which has period its length."
+    return func_defs['R'](to_num_atom(1), x)
+
+def run(period, literal_steps):
+    iterate_op = oper_defs['\\']
+    step = lcg(period)
+    start = to_num_atom(1)
+    print("x -> 5x+3 mod {}".format(period))
+    results = []
+    for detect_cycles in [False, True]:
+        iteration.detect_cycles = detect_cycles
+        label = "cycles" if detect_cycles else "literal"
+        results.append(timed("  {} steps, {}".format(literal_steps, label),
+                             iterate_op(step, to_num_atom(literal_steps)), start, errors=(Exception,)))
+    check("cycles", results[1], results[0])
+    iteration.detect_cycles = True
+    for steps in [10**9, 10**18]:
+        # After n steps from 1, x is 5^n + 3(5^n - 1)/4, and 5^n is 1 mod 4
+        check("cycles", timed("  10^{} steps, cycles".format(len(str(steps)) - 1),
+                              iterate_op(step, to_num_atom(steps)), start, errors=(Exception,)).value,
+              (pow(5, steps, 4*period) + 3 * (pow(5, steps, 4*period) - 1) // 4) % period)
+    print("Rotating a list of {} items".format(period // 64))
+    row = func_defs['r'](to_num_atom(period // 64))
+    rotated = timed("  10^9 steps, cycles", iterate_op(rotate, to_num_atom(10**9)), row, errors=(Exception,))
+    check("rotate", rotated[0].value, 10**9 % (period // 64))
+    print("  starts with {}".format(rotated[0].value))
+    print("Searching for a fixpoint of x -> 5x+3 mod {}".format(period))
+    fixpoint = iterate_op(step, func_defs['='])
+    print("  {}".format(timed("  cycles", fixpoint, start, errors=(Exception,))))
+    print("Collecting a period, keeping {} values".format(iteration.max_history))
+    last = (1 - 3) * pow(5, -1, period) % period
+    collect = iterate_op(to_num_atom(last), step)
+    iteration.detect_cycles = False
+    expected = timed("  literal", collect, start, errors=(Exception,))
+    iteration.detect_cycles = True
+    values = timed("  cycles", collect, start, errors=(Exception,))
+    check("collect", timed("  reading {} values back".format(len(values)), list, values), expected)
+
+if __name__ == "__main__":
+    period = int(sys.argv[1]) if len(sys.argv) > 1 else 2**16
+    literal_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 10**6
+    iteration.max_history = 2**10
+    run(period, literal_steps)
@@ -0,0 +1,39 @@
+"Time programs that call functions again on equal arguments, with and without a memo."
+
+import io
+
+from common import check, timed
+from memo import *
+
+programs = {
+    # Factorize 10 large numbers, each repeated 3000 times
+    'repeated factorizations': ["P`x+$r 10",
+                                "   1000000000000000000",
+                                "    30000"],
+    # Every item differs, so the memo only adds overhead
+    'distinct factorizations': ["P`x+r 30000",
+                                "   1000000000000"],
+}
+
+def printed(f, *args):
+    "The text that f prints when called on args."
+    output.stream = io.StringIO()
+    try:
+        f(*args)
+        output.flush()
+        return output.stream.getvalue()
+    finally:
+        output.stream = None
+
+def run(max_sizes):
+    for (name, matrix) in programs.items():
+        print(name)
+        expected = timed("  no memo", printed, interpret, matrix)
+        for max_size in max_sizes:
+            memo = Memo(max_size)
+            check("memo", timed("  memo of {} results".format(max_size), printed, interpret, matrix, None, None, memo),
+                  expected)
+            print("    " + memo.summary())
+
+if __name__ == "__main__":
+    run([2**4, 2**16])
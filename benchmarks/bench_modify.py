@@ -0,0 +1,43 @@
+"Update single cells of a large matrix with Z under \\, copying only the paths to them."
+
+import sys
+
+from common import check, timed
+from vocab import *
+
+def copying_modify(a, index, item):
+    "A single update as Z did before, by copying the whole value."
+    a = full_copy(a)
+    a[int(index[0])][int(index[1])] = item
+    return a
+
+def run(side, steps, copying_steps):
+    matrix = [[to_num_atom(0)] * side for _ in range(side)]
+    increment = oper_defs['`'](func_defs['>'])
+    def cell(a):
+        "The cell to update, which depends on the matrix so that it's computed at each step."
+        n = to_num_atom(int(a[0][0]) % side)
+        return [[n, n]]
+    step = oper_defs['Z'](variadize(cell, lambda a, b: cell(b)), increment)
+    iterate_op = oper_defs['\\']
+    print("{0}x{0} matrix".format(side))
+    result = timed("  {} updates with Z".format(steps), iterate_op(step, to_num_atom(steps)), matrix)
+    print("  top left cell {}, sum {}".format(result[0][0].value, sum(int(x) for row in result for x in row)))
+    expected = [[0] * side for _ in range(side)]
+    for _ in range(steps):
+        n = expected[0][0] % side
+        expected[n][n] += 1
+    check("Z", [[int(x) for x in row] for row in result], expected)
+    index = [to_num_atom(0), to_num_atom(0)]
+    def copying(a):
+        for _ in range(copying_steps):
+            a = copying_modify(a, index, increment(a[0][0]))
+        return a
+    result = timed("  {} updates copying the matrix".format(copying_steps), copying, matrix)
+    check("copying", int(result[0][0]), copying_steps)
+    check("matrix unchanged", all(int(x) == 0 for row in matrix for x in row), True)
+
+if __name__ == "__main__":
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 10**5
+    run(side, steps, 10)
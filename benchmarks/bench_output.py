@@ -0,0 +1,75 @@
+"Print a large numeric matrix and a long string, with the buffered writer and as before."
+
+import io
+import random
+import sys
+
+from common import check, timed
+from print_parse import *
+
+def old_prettyprint(value, quotes=True):
+    "prettyprint as it was before it wrote into a buffer."
+    if is_atom(value):
+        if value.type == AtomType.num:
+            return str(value.value)
+        else:
+            return "'"*quotes + chr(abs(int(value.value))) + "'"*quotes
+    all_chars = all(atom.type == AtomType.char for atom in flatten(value))
+    if all_chars and height(value) == 1:
+        return '"' + ''.join(old_prettyprint(item, quotes=False) for item in value) + '"'
+    else:
+        return "[" + " ".join(old_prettyprint(item) for item in value) + "]"
+
+def old_matrix_print(value):
+    "matrix_print as it was before it wrote into a buffer."
+    level = height(value)
+    flat = flatten(value)
+    rows = flatten(value, 1)
+    max_len = max(len(row) for row in rows)
+    all_chars = all(atom.type == AtomType.char for atom in flat)
+    pads = [1 + max((len(str(row[i].value)) if row[i].type == AtomType.num else 3*(not all_chars))
+                    if i < len(row) else 0
+                    for row in rows)
+            for i in range(max_len)]
+    if not all_chars:
+        pads[0] -= 1
+    return old_matrix_print_aux(value, level, pads, not all_chars)
+
+def old_matrix_print_aux(value, level, pads, quotes):
+    if level == 1:
+        string = ""
+        for index, item in enumerate(value):
+            if item.type == AtomType.num:
+                string += str(item.value).rjust(pads[index])
+            else:
+                char = chr(abs(int(item.value)))
+                string += ("'"*quotes + char + "'"*quotes).rjust(pads[index])
+        return string
+    return ("\n"*(level-1)).join(old_matrix_print_aux(item, level-1, pads, quotes)
+                                 for item in value)
+
+def run(label, value):
+    def old(format):
+        stream = io.StringIO()
+        print(format(value), file=stream)
+        return stream.getvalue()
+    def buffered(matrix):
+        stream = io.StringIO()
+        writer = OutputWriter(stream)
+        writer.print_value(value, matrix)
+        writer.flush()
+        return stream.getvalue()
+    print(label)
+    expected = timed("  p, old", old, old_prettyprint)
+    check("p", timed("  p, buffered", buffered, False), expected)
+    expected = timed("  P, old", old, old_matrix_print)
+    check("P", timed("  P, buffered", buffered, True), expected)
+
+if __name__ == "__main__":
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 10 * 2**20
+    rng = random.Random(0)
+    matrix = [[to_num_atom(rng.randrange(-10**5, 10**5)) for _ in range(side)] for _ in range(side)]
+    string = [to_char_atom(rng.choice("abcdefgh \n")) for _ in range(length)]
+    run("{0}x{0} matrix".format(side), matrix)
+    run("String of {} characters".format(length), string)
@@ -0,0 +1,47 @@
+"""Time threaded primitives on long lists with 1 to 16 worker processes.
+The speedup is bounded by the number of cores."""
+
+import os
+import random
+import sys
+
+from common import check, timed
+from vocab import *
+
+def random_prime(rng, bits):
+    while True:
+        p = rng.getrandbits(bits) | 1 | 1 << (bits - 1)
+        if is_prime(p):
+            return p
+
+def cases(size):
+    rng = random.Random(size)
+    semiprimes = [to_num_atom(random_prime(rng, 24) * random_prime(rng, 24)) for _ in range(size)]
+    big = [to_num_atom(rng.getrandbits(1024)) for _ in range(size)]
+    rows = [[to_num_atom(rng.randrange(10**6)) for _ in range(500)] for _ in range(size)]
+    factorize, base, sort = func_defs['x'], func_defs['b'], func_defs['o']
+    thread, levels = oper_defs['`'], oper_defs['L']
+    yield ("x on {} semiprimes".format(size), lambda: factorize(semiprimes))
+    yield ("3b on {} 1024-bit numbers".format(size), lambda: base(to_num_atom(3), big))
+    sort_twice = variadize(lambda a: sort(sort(a)), lambda a, b: a)
+    yield ("`(oo) on {} rows".format(size), lambda: thread(sort_twice, to_num_atom(1))(rows))
+    yield ("1L(x) on {} semiprimes".format(size), lambda: levels(to_num_atom(0), factorize)(semiprimes))
+
+def run(size, worker_counts):
+    for (label, f) in cases(size):
+        print(label)
+        expected = None
+        for workers in worker_counts:
+            parallel.workers = workers
+            # Don't reuse the factorizations of the previous run
+            factorizations.clear()
+            result = timed("  {} workers".format(workers), f)
+            if expected is None:
+                expected = result
+            else:
+                check(label, result, expected)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("{} cores".format(os.cpu_count()))
+    run(size, [1, 2, 4, 8, 16])
@@ -0,0 +1,91 @@
+"Parse large sparse grids, and compare with resolving neighbors one cell at a time."
+
+import random
+import sys
+
+from common import check, timed
+from interpreter import *
+
+# Cells that don't read input or start a literal spanning several cells
+cell_chars = "+-*%|<>m#/\\~@BVFAESX0123456789"
+
+max_stepwise_cells = 4 * 10**6
+
+def sparse_grid(size, density, seed=0):
+    "A size x size grid where each cell holds an item with the given probability."
+    rng = random.Random(seed)
+    per_row = max(1, int(size * density))
+    matrix = []
+    for y in range(size):
+        xs = sorted(rng.sample(range(size), per_row))
+        row = []
+        last = 0
+        for x in xs:
+            row.append(' ' * (x - last))
+            row.append(rng.choice(cell_chars))
+            last = x + 1
+        matrix.append(''.join(row))
+    return matrix
+
+def stepwise_find_item(items, max_x, max_y, x, y, direction):
+    "find_item as it was before the grid was indexed."
+    has_value = has_func = has_args = True
+    while x <= max_x and y <= max_y:
+        if (x,y) in items:
+            item = items[(x,y)]
+            if item.type == ItemType.data:
+                return Connection((x,y), has_value, False, has_args)
+            elif item.type == ItemType.function or item.type == ItemType.operator:
+                return Connection((x,y), has_value, has_func, has_args)
+            char = item.content
+            if char == 'B':
+                return Connection(None, False, False, False)
+            elif char == 'V':
+                has_value = False
+            elif char == 'F':
+                has_func = False
+            elif char == 'A':
+                has_args = False
+            elif char == 'X':
+                direction = Dir.south if direction == Dir.east else Dir.east
+            elif char == 'S':
+                direction = Dir.south
+            elif char == 'E':
+                direction = Dir.east
+        if direction == Dir.east:
+            x += 1
+        else:
+            y += 1
+    return Connection(None, False, False, False)
+
+def connection_fields(conn):
+    return (conn.pos, conn.has_value, conn.has_func, conn.has_args)
+
+def links(triples):
+    "The fields of the connections of each item."
+    return {pos: (connection_fields(l_conn), connection_fields(r_conn))
+            for (pos, (_, l_conn, r_conn)) in triples.items() if pos is not None}
+
+def stepwise_links(matrix, triples):
+    "Resolve every item's neighbors by walking the grid cell by cell, like links."
+    items = {pos: item for (pos, (item, _, _)) in triples.items() if pos is not None}
+    max_x = max(len(row) for row in matrix)
+    max_y = len(matrix)
+    return {(x, y): (connection_fields(stepwise_find_item(items, max_x, max_y, x, y+1, Dir.south)),
+                     connection_fields(stepwise_find_item(items, max_x, max_y, x+1, y, Dir.east)))
+            for (x, y) in items}
+
+def run(size, density):
+    matrix = sparse_grid(size, density)
+    print("{0}x{0} grid, density {1}".format(size, density))
+    triples = timed("  parse", parse, matrix)
+    print("  {} items".format(len(triples) - 1))
+    if size * size <= max_stepwise_cells:
+        check("stepwise neighbor resolution",
+              timed("  stepwise neighbor resolution", stepwise_links, matrix, triples), links(triples))
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10**4
+    density = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
+    run(2000, density)
+    run(size, density)
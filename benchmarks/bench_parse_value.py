@@ -0,0 +1,44 @@
+"Parse large values in the input format, from strings and streamed from files."
+
+import io
+import random
+import sys
+
+from common import check, timed
+from print_parse import *
+
+# Each function returns the text of a value and the value
+
+def flat_array(size, rng):
+    numbers = [rng.randrange(-10**6, 10**6) for _ in range(size)]
+    return ("[" + " ".join(str(n) for n in numbers) + "]", from_python(numbers))
+
+def matrix(size, rng):
+    side = int(size ** 0.5)
+    rows = [flat_array(side, rng) for _ in range(side)]
+    return ("[" + "\n".join(text for (text, _) in rows) + "]", [row for (_, row) in rows])
+
+def floats(size, rng):
+    texts = ["{:.6e}".format(rng.uniform(-1, 1)) for _ in range(size)]
+    # A number is read as its mantissa times a power of 10
+    numbers = [float(mantissa) * 10**int(exponent) for (mantissa, exponent) in
+               (text.split("e") for text in texts)]
+    return ("[" + " ".join(texts) + "]", from_python(numbers))
+
+def strings(size, rng):
+    string = [to_char_atom(c) for c in 'ab"c']
+    return ("[" + " ".join('"ab\\"c"' for _ in range(size // 5)) + "]", [string] * (size // 5))
+
+def stream(text):
+    return list(read_values(io.StringIO(text)))
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10**4, 10**5, 10**6]
+    for (label, make) in [("integers", flat_array), ("square matrix", matrix),
+                          ("floats", floats), ("strings", strings)]:
+        for size in sizes:
+            (text, value) = make(size, rng)
+            check(label, timed("{} {}, {:.1f} MB".format(size, label, len(text) / 2**20), parse_value, text),
+                  (value, ""))
+        check("streamed", timed("  streamed from a file", stream, text), [value])
@@ -0,0 +1,41 @@
+"Consume large ranges lazily: length, indexing, take and drop, reversal, folds, arithmetic and filtering."
+
+import functools
+import sys
+
+import common
+from common import check
+from vocab import *
+
+# Every step also reports its peak memory, which stays small when nothing is built
+timed = functools.partial(common.timed, memory=True)
+
+def ints(a):
+    return [int(x) for x in a]
+
+def run(n):
+    num = to_num_atom
+    big = func_defs['r'](num(n))
+    print("Range of {} numbers".format(n))
+    check("#", int(timed("  # length", func_defs['#'], big)), n)
+    check("@", int(timed("  @ index", func_defs['@'], num(n // 3), big)), n // 3)
+    result = timed("  ^ take and v drop", lambda: func_defs['v'](num(10), func_defs['^'](num(n // 2), big)))
+    check("^ and v", (len(result), int(result[0]), int(result[-1])), (n // 2 - 10, 10, n // 2 - 1))
+    check("R", int(timed("  R reverse and index", lambda: func_defs['@'](num(0), func_defs['R'](big)))), n - 1)
+    result = timed("  2D range, indexed", lambda: func_defs['@'](num(n - 1), func_defs['r']([num(n), num(n)])))
+    check("2D range", ints(result), [0, n - 1])
+    check("+/", int(timed("  +/ fold", oper_defs['/'](func_defs['+']), big)), n * (n - 1) // 2)
+    check("M/", int(timed("  M/ fold", oper_defs['/'](func_defs['M']), big)), n - 1)
+    result = timed("  * 2, + 1, - and +/ fold",
+                   lambda: oper_defs['/'](func_defs['+'])(func_defs['-'](func_defs['+'](num(1), func_defs['*'](num(2), big)))))
+    check("odd numbers", int(result), -n * n)
+    m = n // 100
+    small = func_defs['r'](num(m))
+    result = timed("  # filter of {} by |2".format(m), func_defs['#'], func_defs['|'](num(2), small), small)
+    check("# filter", ints(result), [k for k in range(m) if k % 2])
+    result = timed("  # repeat of {} by |3".format(m), func_defs['#'], func_defs['|'](num(3), small), small)
+    check("# repeat", ints(result), [k for k in range(m) for _ in range(k % 3)])
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**8
+    run(n)
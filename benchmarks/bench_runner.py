@@ -0,0 +1,63 @@
+"Compare running many jobs with a process each and with the worker pool of runner."
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import check, timed
+from runner import *
+
+jellyfish = os.path.join(os.path.dirname(__file__), os.pardir, "jellyfish.py")
+
+# The source of each program, and its output on a number
+programs = {
+    'increment': ("p>i", lambda n: n + 1),
+    'sum range': ("p/+ri", lambda n: n * (n - 1) // 2),
+    'sort digits': ("Poi", lambda n: n),
+}
+
+def make_jobs(directory, count):
+    paths = []
+    for (name, (source, _)) in programs.items():
+        path = os.path.join(directory, name.replace(" ", "_") + ".jf")
+        with open(path, 'w') as source_file:
+            source_file.write(source + "\n")
+        paths.append(path)
+    outputs = [output for (_, output) in programs.values()]
+    jobs = []
+    for n in range(count):
+        number = n * 37 % 10000
+        input_path = os.path.join(directory, "{}.in".format(n))
+        with open(input_path, 'w') as input_file:
+            input_file.write("{}\n".format(number))
+        expected_path = os.path.join(directory, "{}.out".format(n))
+        with open(expected_path, 'w') as expected_file:
+            expected_file.write("{}\n".format(outputs[n % len(outputs)](number)))
+        jobs.append(Job(paths[n % len(paths)], input_path, expected_path))
+    return jobs
+
+def processes(jobs):
+    "Run each job in a new process, returning the statuses of the jobs."
+    statuses = []
+    for job in jobs:
+        with open(job.input) as input_file:
+            process = subprocess.run([sys.executable, jellyfish, job.program], stdin=input_file,
+                                     stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        statuses.append(check_output(job, process.stdout))
+    return statuses
+
+def run(count, process_count, worker_counts):
+    with tempfile.TemporaryDirectory() as directory:
+        jobs = make_jobs(directory, count)
+        statuses = timed("{} processes".format(process_count), processes, jobs[:process_count],
+                         count=process_count)
+        check("processes", statuses, ["ok"] * process_count)
+        for workers in worker_counts:
+            results = timed("{} jobs, {} workers".format(count, workers), run_jobs, jobs, workers, count=count)
+            check("runner", [result['status'] for result in results], ["ok"] * count)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("{} cores".format(os.cpu_count()))
+    run(count, 100, [1, 2, 4])
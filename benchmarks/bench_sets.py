@@ -0,0 +1,46 @@
+"Time u, n, N and c on large lists, against the quadratic membership tests they replaced."
+
+import random
+import sys
+
+from common import check, timed
+from vocab import *
+
+def old_uniques(array):
+    out = []
+    for item in array:
+        if item not in out:
+            out.append(item)
+    return out
+
+def to_ints(value):
+    "value as nested lists of ints."
+    return int(value) if is_atom(value) else [to_ints(item) for item in value]
+
+def random_list(size, spread, rng):
+    return [to_num_atom(rng.randrange(spread)) for _ in range(size)]
+
+def run(size, old_size):
+    rng = random.Random(0)
+    a, b = random_list(size, size // 10, rng), random_list(size, size // 10, rng)
+    rows = [random_list(3, 10, rng) for _ in range(size)]
+    print("Lists of {} items".format(size))
+    ints_a, ints_b = to_ints(a), to_ints(b)
+    set_a, set_b = set(ints_a), set(ints_b)
+    check("u", to_ints(timed("  u, numbers", func_defs['u'], a)), list(dict.fromkeys(ints_a)))
+    check("u rows", to_ints(timed("  u, rows of 3", func_defs['u'], rows)),
+          [list(row) for row in dict.fromkeys(tuple(row) for row in to_ints(rows))])
+    check("n", to_ints(timed("  n", func_defs['n'], a, b)), [x for x in ints_a if x in set_b])
+    check("u union", to_ints(timed("  u union", func_defs['u'], a, b)),
+          ints_a + [x for x in dict.fromkeys(ints_b) if x not in set_a])
+    check("N", to_ints(timed("  N", func_defs['N'], a, b)), [x for x in ints_a if x not in set_b])
+    check("c", to_ints(timed("  c, 1000 queries", lambda: [func_defs['c'](x, b) for x in a[:1000]])),
+          [int(x in set_b) for x in ints_a[:1000]])
+    small = a[:old_size]
+    expected = timed("  u, {} numbers, as before".format(old_size), old_uniques, small)
+    check("u", timed("  u, {} numbers".format(old_size), func_defs['u'], small), expected)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    old_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10**4
+    run(size, old_size)
@@ -0,0 +1,31 @@
+"Sort atoms and short rows with o, and compare with sorting by comparison methods."
+
+import random
+import sys
+
+from common import check, timed
+from vocab import *
+
+def run(size, rows):
+    rng = random.Random(0)
+    atoms = [to_num_atom(rng.randrange(size)) for _ in range(size)]
+    print("{} atoms".format(size))
+    expected = timed("  sorted", sorted, atoms)
+    check("o", timed("  o", func_defs['o'], atoms), expected)
+    keys = [to_num_atom(rng.randrange(100)) for _ in range(size)]
+    print("{} atoms by {} keys".format(size, 100))
+    expected = timed("  sorted", lambda: [x for (y, x) in sorted(zip(keys, atoms))])
+    check("o by keys", timed("  o", func_defs['o'], keys, atoms), expected)
+    table = [[to_num_atom(rng.randrange(10)) for _ in range(rng.randrange(1, 6))] for _ in range(rows)]
+    print("{} rows of 1 to 5 atoms".format(rows))
+    expected = timed("  sorted", sorted, table)
+    check("o rows", timed("  o", func_defs['o'], table), expected)
+    nested = [[row] for row in table]
+    print("{} rows, nested".format(rows))
+    expected = timed("  sorted", sorted, nested)
+    check("o nested", timed("  o", func_defs['o'], nested), expected)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10**5
+    run(size, rows)
@@ -0,0 +1,276 @@
+"""Time every primitive and operator on inputs of several sizes and shapes,
+and whole programs, optionally comparing with a baseline from an earlier run.
+A baseline is made by running the suite on the revision to compare with:
+
+    git checkout OLD && python benchmarks/bench_suite.py --output old.json && git checkout -
+    python benchmarks/bench_suite.py --output new.json --baseline old.json
+
+Each case is run repeatedly for at least --min-time seconds and its best time
+per run is recorded; cases that fail or take over --timeout seconds are
+recorded as errors. A digest of the result of the first run is recorded too,
+or of the output of a program, and a case whose digest differs from the
+baseline's is reported as a mismatch. Only the first atoms of a lazy result
+are forced for its digest. Input reads an endless repetition of one line,
+and the random primitives are seeded before each case."""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import signal
+import sys
+import time
+
+# Lets the modules of the interpreter be imported
+import common
+from interpreter import *
+
+# Programs timed through interpret, as lists of lines
+programs = {
+    'sum range': ["P/+r 1000000"],
+    'fold range': ["P/-r 100000"],
+    'factorize range': ["Px r 100000"],
+    'sort range': ["Por 100000"],
+    'uniques': ["Pu|10r 100000"],
+    'reciprocals': ["P%r 100000"],
+    'max of residues': ["P/M|1000r 100000"],
+    'multiplication table': ["P`*r 300"],
+    'permutations': ["P!r 8"],
+    'subsequences': ["PCr 20"],
+}
+examples_dir = os.path.join(os.path.dirname(__file__), os.pardir, "examples")
+# The number of atoms of a result that its digest covers
+digest_atoms = 10**5
+
+class NullStream:
+    "A text stream that discards what's written to it."
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+class EndlessInput:
+    "A text stream that repeats a line forever."
+
+    def __init__(self, line="1 2 3"):
+        self.line = line + "\n"
+
+    def readline(self):
+        return self.line
+
+    def read(self, size=-1):
+        if size < 0:
+            return self.line
+        return (self.line * (size // len(self.line) + 1))[:size]
+
+class Timeout(Exception):
+    pass
+
+def raise_timeout(signum, frame):
+    raise Timeout()
+
+def write_value(value, pieces, budget):
+    "Append the printed form of value to pieces, up to budget atoms, returning the rest of the budget."
+    if is_atom(value):
+        pieces.append(prettyprint(value))
+        return budget - 1
+    pieces.append("[")
+    for item in value:
+        if budget <= 0:
+            pieces.append("...")
+            break
+        budget = write_value(item, pieces, budget)
+        pieces.append(" ")
+    pieces.append("]")
+    return budget
+
+def digest(result):
+    "A digest of the printed form of a result, or of the text a program printed."
+    if isinstance(result, str):
+        text = result
+    elif result is None or callable(result):
+        text = repr(type(result))
+    else:
+        pieces = []
+        write_value(result, pieces, digest_atoms)
+        text = "".join(pieces)
+    return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+
+def time_case(f, min_time, timeout):
+    """The best time of a call of f, or the name of the exception it raised,
+    and the digest of its first result or None."""
+    best = result_digest = None
+    total = 0.0
+    random.seed(0)
+    signal.signal(signal.SIGALRM, raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        while total < min_time:
+            start = time.perf_counter()
+            result = f()
+            elapsed = time.perf_counter() - start
+            if best is None:
+                result_digest = digest(result)
+            total += elapsed
+            best = elapsed if best is None else min(best, elapsed)
+    except Timeout:
+        return (best if best is not None else "Timeout", result_digest)
+    except Exception as error:
+        return (type(error).__name__, result_digest)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return (best, result_digest)
+
+def make_inputs(size):
+    "Values of several shapes with about size atoms."
+    rng = random.Random(size)
+    side = max(1, int(size ** 0.5))
+    return {
+        'flat': [to_num_atom(rng.randrange(10)) for _ in range(size)],
+        'matrix': [[to_num_atom(rng.randrange(10)) for _ in range(side)] for _ in range(side)],
+        'ragged': [[to_num_atom(rng.randrange(10)) for _ in range(rng.randrange(2 * side))]
+                   for _ in range(side)],
+        'string': [to_char_atom(rng.choice("abcdefghij ")) for _ in range(size)],
+    }
+
+def primitive_cases(sizes):
+    "Yield the names and thunks of the cases for the functions and operators."
+    atoms = {'atom': to_num_atom(7), 'char': to_char_atom('x')}
+    for size in sizes:
+        values = make_inputs(size)
+        unary_args = [(name, (value,)) for (name, value) in values.items()]
+        binary_args = [("atom,{}".format(name), (atoms['atom'], value)) for (name, value) in values.items()]
+        binary_args += [("{},atom".format(name), (value, atoms['atom'])) for (name, value) in values.items()]
+        binary_args += [("{0},{0}".format(name), (value, value)) for (name, value) in values.items()]
+        if size == sizes[0]:
+            unary_args = [(name, (atom,)) for (name, atom) in atoms.items()] + unary_args
+            binary_args = [("atom,atom", (atoms['atom'], atoms['atom'])),
+                           ("char,char", (atoms['char'], atoms['char']))] + binary_args
+        functions = [("func {}".format(char), f) for (char, f) in sorted(func_defs.items())]
+        # Operators applied to a threaded primitive and to a value
+        plus, two = func_defs['+'], to_num_atom(2)
+        for (char, oper) in sorted(oper_defs.items()):
+            for (label, inputs) in [("+", (None, plus)), ("2", (None, two)),
+                                    ("+,+", (plus, plus)), ("+,2", (plus, two)), ("2,+", (two, plus))]:
+                functions.append(("oper {} {}".format(char, label), (oper, inputs)))
+        for (name, f) in functions:
+            for (arg_name, args) in unary_args + binary_args:
+                yield ("{} {} {}".format(name, arg_name, size), f, args)
+
+def run_case(f, args):
+    if isinstance(f, tuple):
+        oper, (l_input, r_input) = f
+        f = oper(l_input, r_input)
+    return f(*args)
+
+def program_cases():
+    for (name, matrix) in programs.items():
+        yield ("program {}".format(name), matrix)
+    if os.path.isdir(examples_dir):
+        for file_name in sorted(os.listdir(examples_dir)):
+            if file_name.endswith(".jf"):
+                with open(os.path.join(examples_dir, file_name)) as source_file:
+                    yield ("example {}".format(file_name), source_file.read().splitlines())
+
+def run_program(matrix):
+    "Interpret a program, returning what it printed."
+    stream = output.stream
+    output.stream = io.StringIO()
+    try:
+        interpret(matrix)
+        output.flush()
+        return output.stream.getvalue()
+    finally:
+        output.stream = stream
+
+def run(sizes, min_time, timeout, pattern):
+    """The times of the cases whose name contains pattern, and the digests
+    of their results, as dicts by name."""
+    times, digests = {}, {}
+    sys.setrecursionlimit(10000)
+    # What the primitives print is discarded
+    output.stream = NullStream()
+    stdin = sys.stdin
+    sys.stdin = EndlessInput()
+    try:
+        cases = [(name, lambda f=f, args=args: run_case(f, args))
+                 for (name, f, args) in primitive_cases(sizes)]
+        cases += [(name, lambda matrix=matrix: run_program(matrix))
+                  for (name, matrix) in program_cases()]
+        for (name, thunk) in cases:
+            if pattern is None or pattern in name:
+                times[name], digests[name] = time_case(thunk, min_time, timeout)
+                output.pieces = []
+                output.size = 0
+    finally:
+        sys.stdin = stdin
+        output.stream = None
+    return (times, digests)
+
+def compare(results, baseline, threshold):
+    "Print the cases that got slower or faster than threshold, and return the number of regressions."
+    regressions = 0
+    for (name, seconds) in sorted(results.items()):
+        old = baseline.get(name)
+        if not isinstance(seconds, float) or not isinstance(old, float) or old <= 0:
+            if isinstance(old, float) and not isinstance(seconds, float):
+                regressions += 1
+                print("{:<60} {:>10.6f} -> {}".format(name, old, seconds))
+            continue
+        ratio = seconds / old
+        if ratio > 1 + threshold:
+            regressions += 1
+            print("{:<60} {:>10.6f} -> {:>10.6f}  {:6.2f}x slower".format(name, old, seconds, ratio))
+        elif ratio < 1 / (1 + threshold):
+            print("{:<60} {:>10.6f} -> {:>10.6f}  {:6.2f}x faster".format(name, old, seconds, 1 / ratio))
+    return regressions
+
+def compare_digests(digests, baseline_digests):
+    "Print the cases whose results differ from the baseline's, and return their number."
+    mismatches = 0
+    for (name, result_digest) in sorted(digests.items()):
+        old = baseline_digests.get(name)
+        if old is not None and result_digest is not None and result_digest != old:
+            mismatches += 1
+            print("{:<60} result differs".format(name))
+    return mismatches
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Time the primitives, operators and programs.")
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], metavar='N',
+                            help="numbers of atoms in the list inputs")
+    arg_parser.add_argument('--min-time', type=float, default=0.02, metavar='SECONDS',
+                            help="run each case repeatedly for at least this long")
+    arg_parser.add_argument('--timeout', type=float, default=2.0, metavar='SECONDS',
+                            help="give up on a case after this long")
+    arg_parser.add_argument('--filter', metavar='TEXT',
+                            help="only run the cases whose name contains TEXT")
+    arg_parser.add_argument('--output', metavar='FILE',
+                            help="write the results to FILE as JSON")
+    arg_parser.add_argument('--baseline', metavar='FILE',
+                            help="compare with the results in FILE")
+    arg_parser.add_argument('--threshold', type=float, default=0.2, metavar='RATIO',
+                            help="report cases that are this much slower or faster than the baseline")
+    args = arg_parser.parse_args()
+    results, digests = run(args.sizes, args.min_time, args.timeout, args.filter)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'times': results, 'digests': digests}, output_file, indent=1, sort_keys=True)
+            output_file.write("\n")
+    errors = sum(not isinstance(seconds, float) for seconds in results.values())
+    print("{} cases, {} errors, {:.3f} s in total".format(
+        len(results), errors, sum(seconds for seconds in results.values() if isinstance(seconds, float))))
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if 'times' not in baseline:
+            # Written by a version of the suite without digests
+            baseline = {'times': baseline, 'digests': {}}
+        regressions = compare(results, baseline['times'], args.threshold)
+        mismatches = compare_digests(digests, baseline['digests'])
+        print("{} regressions over {:.0%}, {} results differ".format(regressions, args.threshold, mismatches))
+        sys.exit(1 if regressions or mismatches else 0)
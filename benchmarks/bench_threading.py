@@ -0,0 +1,39 @@
+"Time threaded + on a 1000x1000 grid with and without cached heights."
+
+import sys
+
+from common import check, timed
+from utils import *
+import kernels
+import vocab
+
+def uncached_thread_binary(f, height1, height2):
+    "Threading as it was before heights were cached."
+    def threaded_f(a, b, lev1=height1, lev2=height2):
+        height_a, height_b = height(a), height(b)
+        if height_a <= max(0, lev1) or lev1 == -1:
+            if height_b <= max(0, lev2) or lev2 == -1:
+                return f(a, b)
+            else:
+                return [threaded_f(a, y, -1, incneg(lev2))
+                        for y in b]
+        elif height_b <= max(0, lev2) or lev2 == -1:
+            return [threaded_f(x, b, incneg(lev1), -1)
+                    for x in a]
+        else:
+            return [threaded_f(x, y, incneg(lev1), incneg(lev2))
+                    for (x, y) in zip(a,b)]
+    return threaded_f
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    grid = [[to_num_atom(x*y) for x in range(size)] for y in range(size)]
+    add = vocab.mathy_binary(lambda a, b: a + b)
+    print("Threaded + on a {0}x{0} grid".format(size))
+    expected = timed("before (uncached)", uncached_thread_binary(add, 0, 0), grid, grid)
+    check("after (cached)", timed("after (cached)", thread_binary(add, 0, 0), grid, grid), expected)
+    if kernels.vectorize:
+        check("vectorized", timed("vectorized", vocab.func_defs['+'], grid, grid), expected)
+        array = vocab.func_defs['+'](grid, to_num_atom(0))
+        check("vectorized, array input",
+              timed("vectorized, array input", vocab.func_defs['+'], array, array), expected)
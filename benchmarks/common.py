@@ -0,0 +1,42 @@
+"""Helpers of the benchmark scripts. Importing this module lets the scripts
+import the modules of the interpreter."""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+label_width = 48
+
+def timed(label, f, *args, memory=False, count=None, errors=()):
+    """Call f on args, print label and the time it took, and return the
+    result. With memory, the peak memory allocated by the call is printed
+    too, and with a count, the number of items per second. An exception of
+    a type in errors is printed and returned instead of a result."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = f(*args)
+    except errors as error:
+        print("{:<{}}{}".format(label, label_width, type(error).__name__))
+        return error
+    finally:
+        elapsed = time.perf_counter() - start
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    line = "{:<{}}{:8.3f} s".format(label, label_width, elapsed)
+    if memory:
+        line += " {:10.1f} MB".format(peak / 2**20)
+    if count is not None:
+        line += " {:10.1f} /s".format(count / elapsed if elapsed > 0 else 0.0)
+    print(line)
+    return result
+
+def check(label, result, expected):
+    "Raise an exception if result isn't equal to expected."
+    if result != expected:
+        raise Exception("{}: got {!r:.200}, expected {!r:.200}".format(label.strip(), result, expected))
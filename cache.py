@@ -0,0 +1,118 @@
+from interpreter import *
+import hashlib
+import os
+import pickle
+import sys
+
+# An on-disk cache of linked programs.
+# The output of link is stored in a directory, in a file named after a hash
+# of the source and of the interpreter version, so that editing either
+# invalidates it. The least recently used files are deleted when the
+# directory grows over a size bound.
+
+format_version = 1
+default_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "jellyfish")
+default_max_size = 64 * 2**20
+suffix = ".linked"
+
+# The sources that determine the linked form of a program
+version_modules = ["interpreter.py", "vocab.py", "cache.py"]
+interpreter_version = None
+
+def get_interpreter_version():
+    "A hash of the interpreter sources, the cache format and the Python version."
+    global interpreter_version
+    if interpreter_version is None:
+        digest = hashlib.sha256()
+        digest.update("{} {}".format(format_version, sys.version).encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in version_modules:
+            with open(os.path.join(here, name), 'rb') as module_file:
+                digest.update(module_file.read())
+        interpreter_version = digest.hexdigest()
+    return interpreter_version
+
+class ProgramCache:
+    "A directory of linked programs with size-bounded LRU eviction."
+
+    def __init__(self, directory=default_cache_dir, max_size=default_max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = self.misses = 0
+
+    def key(self, matrix):
+        digest = hashlib.sha256(get_interpreter_version().encode())
+        digest.update("\n".join(matrix).encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + suffix)
+
+    def load(self, key):
+        "Return the cached linked program, or None if it's missing or unreadable."
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                cells = pickle.load(cache_file)
+            # Mark it as recently used
+            os.utime(path)
+        except Exception:
+            # A corrupt file can make unpickling raise almost anything
+            return None
+        if not isinstance(cells, list):
+            return None
+        return cells
+
+    def store(self, key, cells):
+        "Store a linked program, ignoring errors; the cache is only an optimization."
+        path = self.path(key)
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump(cells, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        "Delete the least recently used files until the cache fits in its size bound."
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(suffix):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def link(self, matrix):
+        "Link a program, or load it from the cache."
+        key = self.key(matrix)
+        cells = self.load(key)
+        if cells is None:
+            self.misses += 1
+            cells = link(matrix)
+            self.store(key, cells)
+        else:
+            self.hits += 1
+        return cells
+
+    def parse(self, matrix):
+        "Parse a program like parse, using the cache for the linking step."
+        return build(self.link(matrix))
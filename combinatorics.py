@@ -0,0 +1,180 @@
+from utils import *
+import itertools
+import math
+
+# Lazy sequences of permutations, combinations and subsequences.
+# They are in the same order as itertools generates them, their length is
+# computed from binomial coefficients, and an item is computed from its
+# index (unranked) without generating the items before it.
+
+class Arrangements(VirtualList):
+    "The k-arrangements of the items of a list, each of which is a new list."
+
+    __slots__ = ('items', 'k', 'length')
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    def known_shape(self):
+        if self.k == 0:
+            return [self.length, 0]
+        return [self.length, self.k] + shape(self.items)[1:]
+
+    def known_height(self):
+        if self.k == 0:
+            return 2
+        return 1 + height(self.items)
+
+class Permutations(Arrangements):
+    "The k-permutations of the items of a list."
+
+    __slots__ = ()
+
+    def __init__(self, items, k):
+        self.items = list(items)
+        self.k = k
+        self.length = math.perm(len(self.items), k)
+
+    def item(self, index):
+        remaining = list(range(len(self.items)))
+        word = []
+        for i in range(self.k):
+            block = math.perm(len(remaining) - 1, self.k - i - 1)
+            position, index = divmod(index, block)
+            word.append(self.items[remaining.pop(position)])
+        return word
+
+    def __iter__(self):
+        return map(list, itertools.permutations(self.items, self.k))
+
+class Combinations(Arrangements):
+    "The k-combinations of the items of a list."
+
+    __slots__ = ()
+
+    def __init__(self, items, k):
+        self.items = list(items)
+        self.k = k
+        self.length = math.comb(len(self.items), k)
+
+    def item(self, index):
+        return unrank_combination(self.items, self.k, index)
+
+    def __iter__(self):
+        return map(list, itertools.combinations(self.items, self.k))
+
+class Subsequences(Arrangements):
+    "The subsequences of a list, ordered by length."
+
+    __slots__ = ()
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.k = len(self.items)
+        self.length = 2**len(self.items)
+
+    def known_shape(self):
+        # The empty subsequence truncates the shape
+        return [self.length, 0]
+
+    def item(self, index):
+        n = len(self.items)
+        for k in range(n+1):
+            count = math.comb(n, k)
+            if index < count:
+                return unrank_combination(self.items, k, index)
+            index -= count
+
+    def __iter__(self):
+        return (list(s)
+                for k in range(len(self.items)+1)
+                for s in itertools.combinations(self.items, k))
+
+def unrank_combination(items, k, index):
+    "The combination of k items with the given index in lexicographic order."
+    word = []
+    start = 0
+    for i in range(k):
+        position = start
+        while True:
+            count = math.comb(len(items) - position - 1, k - i - 1)
+            if index < count:
+                break
+            index -= count
+            position += 1
+        word.append(items[position])
+        start = position + 1
+    return word
+
+# Exact factorials and binomial coefficients of ints.
+# Small factorials are kept in a table that is extended on demand. A
+# binomial coefficient is computed by math.comb, unless the same small n
+# comes up again in one call of C, as when it's threaded over a list of k:
+# then the row of Pascal's triangle of n is computed once for that call.
+
+max_factorial_table = 2**10
+factorial_table = [1]
+max_binomial_row = 2**12
+max_binomial_rows = 32
+
+def factorial(n):
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    if n >= max_factorial_table:
+        return math.factorial(n)
+    while len(factorial_table) <= n:
+        factorial_table.append(factorial_table[-1] * len(factorial_table))
+    return factorial_table[n]
+
+def factorial_quotient(m, k):
+    "m! // k! for m, k >= 0, without computing the factorials."
+    if k > m:
+        # Only 0! // 1! is nonzero
+        return 1 if k == 1 else 0
+    if m < max_factorial_table:
+        return factorial(m) // factorial(k)
+    return math.perm(m, m - k)
+
+def binomial_row(n):
+    "The first half of the row n of Pascal's triangle."
+    row = [1]
+    for k in range(n // 2):
+        row.append(row[-1] * (n - k) // (k + 1))
+    return row
+
+def binomial(n, k, rows=None):
+    """n choose k, for 0 <= k <= n. rows is a dict kept by a call of C,
+    from each small n it has seen to its row, once n has come up twice."""
+    if rows is None or n > max_binomial_row:
+        return math.comb(n, k)
+    if n not in rows:
+        if len(rows) >= max_binomial_rows:
+            del rows[next(iter(rows))]
+        rows[n] = None
+        return math.comb(n, k)
+    row = rows[n]
+    if row is None:
+        row = rows[n] = binomial_row(n)
+    return row[min(k, n - k)]
+
+def nonempty(sequence):
+    "Return a lazy sequence, or an empty list if it has no items."
+    return sequence if sequence.length else []
+
+def permutations(items, k=None):
+    if k is None:
+        k = len(items)
+    if k < 0:
+        raise ValueError("r must be non-negative")
+    return nonempty(Permutations(items, k))
+
+def combinations(items, k):
+    if k < 0:
+        raise ValueError("r must be non-negative")
+    return nonempty(Combinations(items, k))
+
+def subsequences(items):
+    return Subsequences(items)
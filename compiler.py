@@ -0,0 +1,173 @@
+from interpreter import *
+
+# Compile the graph returned by parse into a Python function.
+# The function performs the same steps as fill followed by evaluating the
+# top left item, in the same order, but the structure of the graph,
+# the blocking controls and the literal values are resolved when compiling.
+# Each item becomes a group of local variables: its function f, its
+# arguments l and r, and its value v.
+
+unevaluated = object()
+# Python's own compiler needs several KB per generated line, so larger
+# programs are filled instead
+max_compiled_cells = 10**5
+
+class Compiler:
+    "Generates the source of a program's evaluation function."
+
+    def __init__(self, items):
+        self.items = items
+        self.names = {pos: k for (k, pos) in enumerate(sorted((pos for pos in items if pos is not None),
+                                                            key=lambda pos: (pos[1], pos[0])))}
+        self.constants = {'unevaluated': unevaluated}
+        self.lines = []
+        self.indent = 1
+        self.evaluated = {}
+        self.uncertain = set()
+        self.funcs_set = {}
+
+    def emit(self, line):
+        self.lines.append("    "*self.indent + line)
+
+    def var(self, prefix, pos):
+        return "{}{}".format(prefix, self.names[pos])
+
+    def constant(self, pos):
+        name = self.var('c', pos)
+        self.constants[name] = self.items[pos][0].content
+        return name
+
+    def func(self, pos):
+        "The expression for the function of an item, or None if it has none."
+        item = self.items[pos][0]
+        if item.type == ItemType.function:
+            return self.constant(pos)
+        if item.type == ItemType.operator:
+            return self.var('f', pos)
+        return None
+
+    def args(self, pos):
+        "The expressions for the arguments of an item."
+        item = self.items[pos][0]
+        if item.type == ItemType.data:
+            return "None", self.constant(pos)
+        if item.type in [ItemType.function, ItemType.operator]:
+            return self.var('l', pos), self.var('r', pos)
+        return "None", "None"
+
+    def evaluate(self, pos):
+        "Emit the evaluation of an item and return the expression for its value."
+        item = self.items[pos][0]
+        if item.type == ItemType.data:
+            return self.constant(pos)
+        if item.type not in [ItemType.function, ItemType.operator]:
+            return "None"
+        value = self.var('v', pos)
+        state = self.evaluated.get(pos)
+        if state == 'yes':
+            return value
+        l_arg, r_arg = self.args(pos)
+        call = "{} = {}({}, {})".format(value, self.func(pos), l_arg, r_arg)
+        if state == 'maybe':
+            self.emit("if {} is unevaluated:".format(value))
+            self.indent += 1
+            self.emit(call)
+            self.indent -= 1
+        else:
+            self.emit(call)
+        if self.indent == 1:
+            self.evaluated[pos] = 'yes'
+        else:
+            self.evaluated[pos] = 'maybe'
+            self.uncertain.add(pos)
+        return value
+
+    def func_is_set(self, pos):
+        "Whether the function of a filled item is known not to be None."
+        item = self.items[pos][0]
+        if item.type == ItemType.operator:
+            return self.funcs_set[pos]
+        return item.type == ItemType.function
+
+    def operator_input(self, conn, name):
+        "Emit the computation of an operator input into the variable name."
+        nbor = self.items[conn.pos][0]
+        if conn.has_func and nbor.type == ItemType.operator and not self.func_is_set(conn.pos):
+            func = self.func(conn.pos)
+            self.emit("if {} is not None:".format(func))
+            self.emit("    {} = {}".format(name, func))
+            self.emit("else:")
+            self.indent += 1
+            self.emit("{} = {}".format(name, self.evaluate(conn.pos) if conn.has_value else "None"))
+            self.indent -= 1
+        elif conn.has_func and nbor.type in [ItemType.function, ItemType.operator]:
+            self.emit("{} = {}".format(name, self.func(conn.pos)))
+        else:
+            self.emit("{} = {}".format(name, self.evaluate(conn.pos) if conn.has_value else "None"))
+
+    def fill_item(self, pos):
+        "Emit the steps of fill_item for the given item."
+        item, l_conn, r_conn = self.items[pos]
+        if item.type == ItemType.function:
+            self.emit("# function at {}".format(pos))
+            l_arg = self.evaluate(l_conn.pos) if l_conn.has_value else "None"
+            self.emit("{} = {}".format(self.var('l', pos), l_arg))
+            r_arg = self.evaluate(r_conn.pos) if r_conn.has_value else "None"
+            self.emit("{} = {}".format(self.var('r', pos), r_arg))
+        elif item.type == ItemType.operator:
+            self.emit("# operator at {}".format(pos))
+            self.operator_input(l_conn, "l_input")
+            self.operator_input(r_conn, "r_input")
+            self.emit("{} = {}(l_input, r_input)".format(self.var('f', pos), self.constant(pos)))
+            # Operators are variadized, so they give None only on two None inputs
+            self.funcs_set[pos] = any(conn.has_func and self.func_is_set(conn.pos) or
+                                      conn.has_value and self.items[conn.pos][0].type == ItemType.data
+                                      for conn in [l_conn, r_conn])
+            args = "{}, {}".format(*self.args(pos))
+            l_args = "{}, {}".format(*self.args(l_conn.pos)) if l_conn.has_args else "None, None"
+            r_nbor = self.items[r_conn.pos][0]
+            if not r_conn.has_args or r_nbor.type == ItemType.dummy:
+                self.emit("{} = {}".format(args, l_args))
+            elif r_nbor.type == ItemType.data:
+                # A value is its own argument, so it's never None
+                self.emit("{} = {}, {}".format(args, *self.args(r_conn.pos)))
+            else:
+                r_l_arg, r_r_arg = self.args(r_conn.pos)
+                self.emit("{} = ({}) if {} is None and {} is None else ({}, {})".format(
+                    args, l_args, r_l_arg, r_r_arg, r_l_arg, r_r_arg))
+
+    def compile(self, pos=(0,0)):
+        for item_pos in fill_order(self.items, pos):
+            self.fill_item(item_pos)
+        result = self.evaluate(pos)
+        header = ["def run():"]
+        header += ["    {} = unevaluated".format(self.var('v', uncertain))
+                   for uncertain in sorted(self.uncertain, key=self.names.get)]
+        return "\n".join(header + self.lines + ["    return " + result, ""])
+
+def compile_source(items):
+    "Return the Python source of the evaluation function and its constants."
+    compiler = Compiler(items)
+    source = compiler.compile()
+    return source, compiler.constants
+
+def compile_program(items):
+    "Compile the output of parse into a function that runs the program."
+    return CompiledProgram(items).run
+
+class CompiledProgram:
+    """The evaluation function of a program. The values of the data items are
+    globals of the function, so those of the input items can be changed
+    between runs with set_value."""
+
+    def __init__(self, items):
+        compiler = Compiler(items)
+        source = compiler.compile()
+        self.namespace = dict(compiler.constants)
+        exec(compile(source, "<jellyfish program>", "exec"), self.namespace)
+        self.run = self.namespace['run']
+        self.constant_names = {pos: compiler.var('c', pos) for pos in compiler.names}
+
+    def set_value(self, pos, value):
+        "Set the value of the data item at pos."
+        self.namespace[self.constant_names[pos]] = value
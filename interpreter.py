@@ -1,7 +1,11 @@
 from utils import *
 from vocab import *
 from enum import Enum
+from bisect import bisect_left
+import io
 import math
+import re
+import sys
 
 
 class Dir(Enum):
@@ -28,6 +32,11 @@ class Item:
         self.l_arg = None
         self.r_arg = None
 
+    def reset(self):
+        "Clear the fields set by filling and evaluating."
+        self.filled = self.evald = False
+        self.value = self.func = self.l_arg = self.r_arg = None
+
     def evaluate(self):
         if self.type in [ItemType.function, ItemType.operator] and not self.evald:
             self.value = self.func(self.l_arg, self.r_arg)
@@ -43,141 +52,237 @@ class Connection:
         self.has_func = has_func
         self.has_args = has_args
 
-def find_item(items, max_x, max_y, x, y, direction):
+class SparseGrid:
+    """The items of a code matrix, stored by row and indexed by column,
+    so that the nearest item in either direction can be found by bisection."""
+
+    def __init__(self):
+        self.rows = {}
+        self.columns = {}
+
+    def add(self, x, y, item):
+        "Add an item; rows must be added from top to bottom and left to right."
+        xs, row_items = self.rows.setdefault(y, ([], []))
+        xs.append(x)
+        row_items.append(item)
+        self.columns.setdefault(x, []).append(y)
+
+    def next_item(self, x, y, direction):
+        """Find the first item at or after (x, y) in the given direction.
+        Returns its position and the item, or None if there's no such item."""
+        if direction == Dir.south:
+            ys = self.columns.get(x, ())
+            i = bisect_left(ys, y)
+            if i == len(ys):
+                return None
+            y = ys[i]
+        elif y not in self.rows:
+            return None
+        xs, row_items = self.rows[y]
+        i = bisect_left(xs, x)
+        if i == len(xs):
+            return None
+        return (xs[i], y), row_items[i]
+
+    def __iter__(self):
+        "Iterate over the positions and items in reading order."
+        for y, (xs, row_items) in self.rows.items():
+            for x, item in zip(xs, row_items):
+                yield (x, y), item
+
+def find_item(grid, x, y, direction):
     "Returns a Connection object."
     has_value = has_func = has_args = True
-    while x <= max_x and y <= max_y:
-        if (x,y) in items:
-            item = items[(x,y)]
-            if item.type == ItemType.data:
-                return Connection((x,y), has_value, False, has_args)
-            elif item.type == ItemType.function or item.type == ItemType.operator:
-                return Connection((x,y), has_value, has_func, has_args)
-            elif item.type == ItemType.control:
-                char = item.content
-                if char == 'B': # Block all
-                    return Connection(None, False, False, False)
-                elif char == 'V': # Block value
-                    has_value = False
-                elif char == 'F': # Block function
-                    has_func = False
-                elif char == 'A': # Block arguments
-                    has_args = False
-                elif char == 'X': # Switch direction
-                    if direction == Dir.east:
-                        direction = Dir.south
-                    else:
-                        direction = Dir.east
-                elif char == 'S': # Turn south
+    while True:
+        found = grid.next_item(x, y, direction)
+        if found is None:
+            break
+        (x, y), (type, char, _) = found
+        if type == ItemType.data:
+            return Connection((x,y), has_value, False, has_args)
+        elif type == ItemType.function or type == ItemType.operator:
+            return Connection((x,y), has_value, has_func, has_args)
+        elif type == ItemType.control:
+            if char == 'B': # Block all
+                return Connection(None, False, False, False)
+            elif char == 'V': # Block value
+                has_value = False
+            elif char == 'F': # Block function
+                has_func = False
+            elif char == 'A': # Block arguments
+                has_args = False
+            elif char == 'X': # Switch direction
+                if direction == Dir.east:
                     direction = Dir.south
-                elif char == 'E': # Turn east
+                else:
                     direction = Dir.east
+            elif char == 'S': # Turn south
+                direction = Dir.south
+            elif char == 'E': # Turn east
+                direction = Dir.east
         if direction == Dir.east:
             x += 1
         else:
             y += 1
     return Connection(None, False, False, False)
 
-def parse(matrix):
-    "Parse a code matrix into a graph of items."
-    items = {}
-    digits = "0123456789"
-    control_chars = "BVFAESX"
+digits = "0123456789"
+control_chars = "BVFAESX"
+# Characters that start an item; everything else is whitespace
+item_start = re.compile("[{}]".format(re.escape("'\"iI" + digits + control_chars +
+                                                  "".join(func_defs) + "".join(oper_defs))))
+
+def item_type(char):
+    "The type of the item starting with the given character."
+    if char in "'\"iI" or char in digits:
+        return ItemType.data
+    elif char in func_defs:
+        return ItemType.function
+    elif char in oper_defs:
+        return ItemType.operator
+    return ItemType.control
+
+def tokenize(matrix):
+    """Generate the items of a code matrix in reading order.
+    Each is a tuple (x, y, char, literal), where char is the first character
+    of the item and literal is the parsed value of a character, string or
+    number literal, or None for other items."""
     for y in range(len(matrix)):
         # Parse a row
+        row = matrix[y]
         x = 0
-        while x < len(matrix[y]):
-            char = matrix[y][x]
+        while True:
+            # Skip to the next item
+            match = item_start.search(row, x)
+            if match is None:
+                break
+            x = match.start()
+            char = row[x]
             if char == "'":
                 # Parse a character
-                if x == len(matrix[y]) - 1:
+                if x == len(row) - 1:
                     parsed_char = '\n'
                 else:
-                    parsed_char = matrix[y][x+1]
-                item = Item(ItemType.data, to_char_atom(parsed_char))
-                items[(x,y)] = item
+                    parsed_char = row[x+1]
+                yield x, y, char, parsed_char
                 x += 2
             elif char == '"':
                 # Parse a string
                 i = x + 1
                 chars = []
-                while i < len(matrix[y]) and matrix[y][i] != '"':
-                    parsed_char = matrix[y][i]
+                while i < len(row) and row[i] != '"':
+                    parsed_char = row[i]
                     if parsed_char == '\\':
-                        if i == len(matrix[y]) - 1:
+                        if i == len(row) - 1:
                             parsed_char = '\n'
                         else:
-                            parsed_char = matrix[y][i+1]
+                            parsed_char = row[i+1]
                             if parsed_char == 'n':
                                 parsed_char = '\n'
                         i += 2
                     else:
                         i += 1
                     chars.append(parsed_char)
-                item = Item(ItemType.data, [to_char_atom(c) for c in chars])
-                items[(x,y)] = item
+                yield x, y, char, "".join(chars)
                 x = i + 1
             elif char in digits:
                 # Parse a number
-                num = ""
                 i = x
-                while i < len(matrix[y]) and matrix[y][i] in digits:
-                    num += matrix[y][i]
+                while i < len(row) and row[i] in digits:
                     i += 1
-                item = Item(ItemType.data, to_num_atom(int(num)))
-                items[(x,y)] = item
+                yield x, y, char, int(row[x:i])
                 x = i
-            elif char == 'i':
-                # Parse input
-                input_value = parse_value(input())[0]
-                item = Item(ItemType.data, input_value)
-                items[(x,y)] = item
-                x += 1
-            elif char == 'I':
-                # Parse raw string input
-                input_string = input()
-                input_value = [to_char_atom(char) for char in input_string]
-                item = Item(ItemType.data, input_value)
-                items[(x,y)] = item
-                x += 1
-            elif char in func_defs:
-                # Parse a function
-                item = Item(ItemType.function, func_defs[char])
-                items[(x,y)] = item
-                x += 1
-            elif char in oper_defs:
-                # Parse a operator
-                item = Item(ItemType.operator, oper_defs[char])
-                items[(x,y)] = item
-                x += 1
-            elif char in control_chars:
-                # Parse a control character
-                item = Item(ItemType.control, char)
-                items[(x,y)] = item
-                x += 1
             else:
+                # Parse a single-character item
+                yield x, y, char, None
                 x += 1
+
+def link(matrix):
+    """Tokenize a code matrix and find the neighbors of its items.
+    The result is a list of tuples (pos, char, literal, l_conn, r_conn) in
+    reading order, where the connections are tuples of the fields of
+    Connection objects. It's made of plain values so that it can be cached,
+    and input is only read when the items are built."""
+    grid = SparseGrid()
+    for (x, y, char, literal) in tokenize(matrix):
+        grid.add(x, y, (item_type(char), char, literal))
+    cells = []
+    for ((x, y), (_, char, literal)) in grid:
+        l_conn = find_item(grid, x, y+1, Dir.south)
+        r_conn = find_item(grid, x+1, y, Dir.east)
+        cells.append(((x,y), char, literal,
+                      (l_conn.pos, l_conn.has_value, l_conn.has_func, l_conn.has_args),
+                      (r_conn.pos, r_conn.has_value, r_conn.has_func, r_conn.has_args)))
+    return cells
+
+def read_input(char, read_line=input):
+    "Read the value of an input item, i or I, using the given line reader."
+    if char == 'i':
+        # Parse input
+        return parse_input(read_line())
+    # Parse raw string input
+    return [to_char_atom(c) for c in read_line()]
+
+def make_item(char, literal, read_line=input):
+    """Create the item starting with the given character.
+    Input items are read using read_line, or left empty if it's None."""
+    if char == "'":
+        return Item(ItemType.data, to_char_atom(literal))
+    elif char == '"':
+        return Item(ItemType.data, [to_char_atom(c) for c in literal])
+    elif char in digits:
+        return Item(ItemType.data, to_num_atom(literal))
+    elif char in "iI":
+        return Item(ItemType.data, None if read_line is None else read_input(char, read_line))
+    elif char in func_defs:
+        return Item(ItemType.function, func_defs[char])
+    elif char in oper_defs:
+        return Item(ItemType.operator, oper_defs[char])
+    return Item(ItemType.control, char)
+
+def build(cells, read_line=input):
+    "Build the graph of items from the output of link."
     triples = {}
-    max_x = max(len(row) for row in matrix)
-    max_y = len(matrix)
-    for ((x, y), item) in items.items():
-            l_conn = find_item(items, max_x, max_y, x, y+1, Dir.south)
-            r_conn = find_item(items, max_x, max_y, x+1, y, Dir.east)
-            triples[(x,y)] = (item, l_conn, r_conn)
+    for (pos, char, literal, l_conn, r_conn) in cells:
+        triples[pos] = (make_item(char, literal, read_line), Connection(*l_conn), Connection(*r_conn))
     triples[None] = (Item(ItemType.dummy, "Dummy"), None, None)
     return triples
 
-def fill(items, pos=(0,0), level=0):
-    "Fill in the fields of the given items."
+def parse(matrix):
+    "Parse a code matrix into a graph of items."
+    return build(link(matrix))
+
+def fill_order(items, pos=(0,0)):
+    """Yield the positions of the items that fill reaches from pos and that
+    are not yet filled, in the order they are filled: each item after the
+    items it takes its inputs from. Uses an explicit stack instead of recursion."""
+    stack = [(pos, False)]
+    seen = set()
+    while stack:
+        pos, expanded = stack.pop()
+        if expanded:
+            yield pos
+            continue
+        item, l_conn, r_conn = items[pos]
+        if pos in seen or item.filled or item.type == ItemType.dummy:
+            continue
+        seen.add(pos)
+        if item.type == ItemType.data:
+            yield pos
+        else:
+            stack.append((pos, True))
+            stack.append((r_conn.pos, False))
+            stack.append((l_conn.pos, False))
+
+def fill_item(items, pos):
+    "Fill in the fields of an item whose neighbors have been filled."
     item, l_conn, r_conn = items[pos]
-    if item.filled or item.type == ItemType.dummy:
-        return item
     if item.type == ItemType.data:
         item.value = item.content
         item.r_arg = item.content
     else:
-        l_nbor = fill(items, l_conn.pos, level+1)
-        r_nbor = fill(items, r_conn.pos, level+1)
+        l_nbor = items[l_conn.pos][0]
+        r_nbor = items[r_conn.pos][0]
         if item.type == ItemType.function:
             item.func = item.content
             item.l_arg = l_nbor.evaluate() if l_conn.has_value else None
@@ -201,10 +306,85 @@ def fill(items, pos=(0,0), level=0):
             else:
                 item.l_arg, item.r_arg = r_l_arg, r_r_arg
     item.filled = True
-    return item
 
-def interpret(matrix):
-    "Interpret a program, returning the top left value."
-    items = parse(matrix)
-    corner = fill(items)
-    return corner.evaluate()
+def fill(items, pos=(0,0), order=None):
+    """Fill in the fields of the given items.
+    If order is a list, the positions of the items are appended to it in the
+    order they are filled, for debugging."""
+    for item_pos in fill_order(items, pos):
+        fill_item(items, item_pos)
+        if order is not None:
+            order.append(item_pos)
+    return items[pos][0]
+
+def interpret(matrix, cache=None, profiler=None, memo=None):
+    """Interpret a program, returning the top left value.
+    If cache is a ProgramCache, the linked program is loaded from it.
+    If profiler is a Profiler, the calls of the cells are recorded in it.
+    If memo is a Memo, the results of the functions are kept in it."""
+    items = parse(matrix) if cache is None else cache.parse(matrix)
+    if memo is not None:
+        memo.instrument(items)
+    if profiler is not None:
+        profiler.instrument(items)
+    try:
+        corner = fill(items)
+        return corner.evaluate()
+    finally:
+        output.flush()
+        clear_key_sets()
+
+class Program:
+    """A program that is parsed once and can be run many times.
+    It's compiled into a Python function, unless it's too large, in which
+    case the items are reused between runs; only their filled and evaluated
+    fields and the values of the input items change."""
+
+    def __init__(self, matrix, cache=None, profiler=None, memo=None):
+        # The compiler module imports this one
+        from compiler import CompiledProgram, max_compiled_cells
+        cells = link(matrix) if cache is None else cache.link(matrix)
+        self.items = build(cells, read_line=None)
+        if memo is not None:
+            memo.instrument(self.items)
+        if profiler is not None:
+            profiler.instrument(self.items)
+        self.inputs = [(pos, char) for (pos, char, _, _, _) in cells if char in "iI"]
+        self.corner = self.items[(0,0)][0]
+        if len(cells) <= max_compiled_cells:
+            self.compiled = CompiledProgram(self.items)
+        else:
+            self.compiled = None
+            self.order = list(fill_order(self.items))
+
+    def run(self, lines=None):
+        """Run the program with the given input lines, returning the top left value.
+        Input items are read from the lines in reading order, or from STDIN if
+        lines is None; the lines they leave are then read by the input
+        functions instead of STDIN. Printed output stays in the buffer of
+        output until it's full or flushed."""
+        remaining = None if lines is None else iter(lines)
+        read_line = input if lines is None else remaining.__next__
+        for (pos, char) in self.inputs:
+            try:
+                value = read_input(char, read_line)
+            except StopIteration:
+                raise EOFError("not enough input lines")
+            if self.compiled is None:
+                self.items[pos][0].content = value
+            else:
+                self.compiled.set_value(pos, value)
+        stdin = sys.stdin
+        if remaining is not None:
+            sys.stdin = io.StringIO("".join(line + "\n" for line in remaining))
+        try:
+            if self.compiled is not None:
+                return self.compiled.run()
+            for (item, _, _) in self.items.values():
+                item.reset()
+            for pos in self.order:
+                fill_item(self.items, pos)
+            return self.corner.evaluate()
+        finally:
+            sys.stdin = stdin
+            clear_key_sets()
@@ -1,6 +1,90 @@
-from interpreter import interpret
+from interpreter import interpret, Program, output, iteration, parallel
+from cache import ProgramCache, default_cache_dir, default_max_size
+from batch import read_records, run_batch
+from profiler import Profiler
+from memo import Memo
+import argparse
 import sys
 
-with open(sys.argv[1], 'r') as source_file:
-    program = source_file.read().splitlines()
-    interpret(program)
+arg_parser = argparse.ArgumentParser(description="Run a Jellyfish program.")
+arg_parser.add_argument('source_file')
+arg_parser.add_argument('--cache', action='store_true',
+                        help="cache linked programs on disk")
+arg_parser.add_argument('--cache-dir', default=default_cache_dir, metavar='DIR',
+                        help="cache directory (default {})".format(default_cache_dir))
+arg_parser.add_argument('--cache-size', type=int, default=default_max_size, metavar='BYTES',
+                        help="size bound of the cache directory")
+arg_parser.add_argument('--batch', action='store_true',
+                        help="run the program once for each input record")
+arg_parser.add_argument('--delimiter', metavar='LINE',
+                        help="in batch mode, records are blocks of lines separated by LINE, "
+                             "which is also printed after the output of each record; "
+                             "by default each line is a record")
+arg_parser.add_argument('--input', metavar='FILE',
+                        help="in batch mode, read records from FILE instead of STDIN")
+arg_parser.add_argument('--unbuffered', action='store_true',
+                        help="flush the output after every printed value "
+                             "(the default when the output is a terminal)")
+arg_parser.add_argument('--buffer-size', type=int, default=output.buffer_size, metavar='CHARS',
+                        help="flush the output when this many characters are buffered")
+arg_parser.add_argument('--detect-cycles', action='store_true',
+                        help="when iterating with \\, skip repeating values, and stop iterations "
+                             "whose values cycle without reaching their condition; "
+                             "this assumes that the iterated functions are pure")
+arg_parser.add_argument('--max-history', type=int, default=iteration.max_history, metavar='VALUES',
+                        help="with --detect-cycles, the number of values kept when collecting "
+                             "the values of an iteration; the others are recomputed")
+arg_parser.add_argument('--workers', type=int, default=parallel.workers, metavar='N',
+                        help="run long maps of threaded functions in N worker processes "
+                             "(default 1, no workers); this assumes that the functions are pure")
+arg_parser.add_argument('--parallel-time', type=float, default=parallel.min_time, metavar='SECONDS',
+                        help="with --workers, only use the workers for maps that are estimated "
+                             "to take longer than this")
+arg_parser.add_argument('--memo', action='store_true',
+                        help="reuse the results of functions called again on equal arguments; "
+                             "results that depend on impure primitives are not reused")
+arg_parser.add_argument('--memo-size', type=int, default=2**16, metavar='RESULTS',
+                        help="with --memo, the number of results kept")
+arg_parser.add_argument('--memo-stats', action='store_true',
+                        help="with --memo, print the hits and misses to STDERR")
+arg_parser.add_argument('--profile', action='store_true',
+                        help="print a heatmap of the time spent in each cell and a table "
+                             "of the slowest cells to STDERR")
+arg_parser.add_argument('--profile-json', metavar='FILE',
+                        help="write the calls, times and element counts of each cell to FILE as JSON")
+args = arg_parser.parse_args()
+
+output.buffer_size = args.buffer_size
+output.flush_each = args.unbuffered or sys.stdout.isatty()
+iteration.detect_cycles = args.detect_cycles
+iteration.max_history = args.max_history
+parallel.workers = args.workers
+parallel.min_time = args.parallel_time
+
+cache = ProgramCache(args.cache_dir, args.cache_size) if args.cache else None
+profiler = Profiler() if args.profile or args.profile_json else None
+memo = Memo(args.memo_size) if args.memo else None
+
+with open(args.source_file, 'r') as source_file:
+    matrix = source_file.read().splitlines()
+
+def write_profile():
+    if args.profile:
+        profiler.write_summary(matrix)
+    if args.profile_json:
+        profiler.write_json(matrix, args.profile_json)
+
+try:
+    if args.batch:
+        program = Program(matrix, cache, profiler, memo)
+        input_file = sys.stdin if args.input is None else open(args.input, 'r')
+        with input_file:
+            failures = run_batch(program, read_records(input_file, args.delimiter), args.delimiter)
+        sys.exit(1 if failures else 0)
+    else:
+        interpret(matrix, cache, profiler, memo)
+finally:
+    if profiler is not None:
+        write_profile()
+    if memo is not None and args.memo_stats:
+        memo.write_summary()
@@ -0,0 +1,38 @@
+from runner import read_manifest, run_jobs, summary
+import argparse
+import json
+import os
+import sys
+import time
+
+arg_parser = argparse.ArgumentParser(description="Run the Jellyfish programs of a manifest on their inputs.")
+arg_parser.add_argument('manifest',
+                        help="file with a job per line: a program, and optionally an input file "
+                             "and a file of the expected output")
+arg_parser.add_argument('--workers', type=int, metavar='N',
+                        help="number of worker processes (default the number of CPUs)")
+arg_parser.add_argument('--timeout', type=float, default=10.0, metavar='SECONDS',
+                        help="stop a job after this long (default 10)")
+arg_parser.add_argument('--output-dir', metavar='DIR',
+                        help="write the output of the n-th job to DIR/n.out")
+arg_parser.add_argument('--json', metavar='FILE',
+                        help="write the results and timings of the jobs to FILE as JSON")
+args = arg_parser.parse_args()
+
+jobs = read_manifest(args.manifest)
+start = time.perf_counter()
+results = run_jobs(jobs, args.workers, args.timeout)
+wall_time = time.perf_counter() - start
+
+if args.output_dir:
+    os.makedirs(args.output_dir, exist_ok=True)
+    for (n, result) in enumerate(results, 1):
+        with open(os.path.join(args.output_dir, "{}.out".format(n)), 'w',
+                  errors='surrogateescape') as output_file:
+            output_file.write(result['output'])
+if args.json:
+    with open(args.json, 'w') as json_file:
+        json.dump({'time': wall_time, 'jobs': results}, json_file, indent=1)
+        json_file.write("\n")
+print(summary(results, wall_time))
+sys.exit(0 if all(result['status'] == "ok" for result in results) else 1)
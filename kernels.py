@@ -0,0 +1,451 @@
+from utils import *
+import functools
+
+# Vectorized implementations of 0-threaded arithmetic functions.
+# They are used when NumPy is available and the arguments are rectangular
+# numeric arrays; a kernel returns None when it can't reproduce the exact
+# result of the atom-by-atom definition, and the caller falls back to that.
+
+vectorize = numpy is not None
+min_size = 64
+
+int_bound = 2**63
+float_int_bound = 2**53
+
+def to_ndarray(value):
+    "Convert a value into an ndarray, or return None if it's not numeric and rectangular."
+    if isinstance(value, NumArray):
+        return value.array
+    if isinstance(value, Range):
+        return range_to_ndarray(value) if len(value) >= min_size else None
+    if is_atom(value):
+        if value.type != AtomType.num:
+            return None
+        return python_to_ndarray([value.value], ())
+    dims = []
+    focus = value
+    while not is_atom(focus):
+        if not focus:
+            return None
+        dims.append(len(focus))
+        focus = focus[0]
+    size = 1
+    for dim in dims:
+        size *= dim
+    if size < min_size:
+        return None
+    numbers = []
+    if not collect_numbers(value, dims, 0, numbers):
+        return None
+    return python_to_ndarray(numbers, tuple(dims))
+
+def range_to_ndarray(value):
+    "The numbers of a numeric Range as an int64 array, or None."
+    numbers = value.range
+    if value.type != AtomType.num or max(abs(numbers[0]), abs(numbers[-1])) >= int_bound // 2:
+        return None
+    return numpy.arange(numbers.start, numbers[-1] + numbers.step, numbers.step, dtype=numpy.int64)
+
+def collect_numbers(value, dims, depth, out):
+    if isinstance(value, NumArray):
+        if list(value.array.shape) != dims[depth:]:
+            return False
+        out.extend(value.array.ravel().tolist())
+        return True
+    if isinstance(value, Range):
+        if value.type != AtomType.num or [len(value)] != dims[depth:]:
+            return False
+        out.extend(value.range)
+        return True
+    if is_atom(value) or len(value) != dims[depth]:
+        return False
+    if depth == len(dims) - 1:
+        for item in value:
+            if not is_atom(item) or item.type != AtomType.num:
+                return False
+            out.append(item.value)
+        return True
+    return all(collect_numbers(item, dims, depth+1, out) for item in value)
+
+def python_to_ndarray(numbers, dims):
+    types = set(map(type, numbers))
+    if types == {int}:
+        if -int_bound <= min(numbers) and max(numbers) < int_bound:
+            array = numpy.array(numbers, dtype=numpy.int64)
+        else:
+            array = numpy.empty(len(numbers), dtype=object)
+            array[:] = numbers
+    elif types == {float}:
+        array = numpy.array(numbers, dtype=numpy.float64)
+    else:
+        return None
+    return array.reshape(dims)
+
+def magnitude(array):
+    "The largest absolute value in an integer array, as a Python int."
+    if array.size == 0:
+        return 0
+    return max(abs(int(array.max())), abs(int(array.min())))
+
+def is_int(array):
+    return array.dtype == numpy.int64
+
+def is_float(array):
+    return array.dtype == numpy.float64
+
+def is_object(array):
+    return array.dtype == object
+
+def promote(array):
+    "Convert an int64 array into an array of Python ints."
+    return array.astype(object) if is_int(array) else array
+
+def align(x, y):
+    "Truncate and reshape two arrays so that they broadcast like threading zips them."
+    common = tuple(slice(0, min(m, n)) for (m, n) in zip(x.shape, y.shape))
+    if common:
+        x, y = x[common], y[common]
+    x = x.reshape(x.shape + (1,)*(y.ndim - x.ndim))
+    y = y.reshape(y.shape + (1,)*(x.ndim - y.ndim))
+    return x, y
+
+def vectorized_unary(kernel):
+    def decorate(f):
+        def vectorized_f(a):
+            if vectorize and not is_atom(a):
+                x = to_ndarray(a)
+                if x is not None:
+                    with numpy.errstate(all='ignore'):
+                        result = kernel(x)
+                    if result is not None:
+                        return from_ndarray(result)
+            return f(a)
+        return vectorized_f
+    return decorate
+
+def vectorized_binary(kernel):
+    def decorate(f):
+        def vectorized_f(a, b):
+            if vectorize and not (is_atom(a) and is_atom(b)):
+                x, y = to_ndarray(a), to_ndarray(b)
+                if x is not None and y is not None:
+                    with numpy.errstate(all='ignore'):
+                        result = kernel(*align(x, y))
+                    if result is not None:
+                        return from_ndarray(result)
+            return f(a, b)
+        return vectorized_f
+    return decorate
+
+def additive(x, y):
+    "Promote int arrays to Python ints if their sum or difference may overflow."
+    if is_int(x) and is_int(y) and magnitude(x) + magnitude(y) >= int_bound:
+        return promote(x), promote(y)
+    return x, y
+
+def kernel_abs(x):
+    if is_int(x) and magnitude(x) >= int_bound - 1:
+        x = promote(x)
+    return abs(x)
+
+def kernel_add(x, y):
+    x, y = additive(x, y)
+    return x + y
+
+def kernel_negate(x):
+    if is_int(x) and magnitude(x) >= int_bound - 1:
+        x = promote(x)
+    return -x
+
+def kernel_subtract(x, y):
+    x, y = additive(x, y)
+    return y - x
+
+def kernel_signum(x):
+    if is_object(x):
+        return None
+    return (x > 0).astype(numpy.int64) - (x < 0).astype(numpy.int64)
+
+def kernel_multiply(x, y):
+    if is_int(x) and is_int(y) and magnitude(x) * magnitude(y) >= int_bound:
+        x, y = promote(x), promote(y)
+    return x * y
+
+def kernel_reciprocal(x):
+    if is_object(x) or is_int(x) and magnitude(x) >= float_int_bound:
+        return None
+    if (x == 0).any():
+        # 1/0 is the integer 0, which would mix ints and floats
+        return None
+    return 1 / x
+
+def kernel_divide(x, y):
+    if is_object(x) or is_object(y):
+        return None
+    zeros = (x == 0) | (y == 0)
+    if is_int(x) and is_int(y):
+        if magnitude(x) >= float_int_bound or magnitude(y) >= float_int_bound:
+            return None
+        divisor = numpy.where(zeros, 1, x)
+        exact = (y % divisor == 0) | zeros
+        if exact.all():
+            return numpy.where(zeros, 0, y // divisor)
+        if exact.any():
+            return None
+        return y / x
+    if zeros.any():
+        return None
+    return y / x
+
+def kernel_round(x):
+    return floor_to_int(x + 0.5) if not is_object(x) else None
+
+def kernel_modulus(x, y):
+    if is_object(x) or is_object(y):
+        return None
+    zeros = (x == 0) | (y == 0)
+    if is_int(x) and is_int(y):
+        return numpy.where(zeros, 0, y % numpy.where(zeros, 1, x))
+    if zeros.any():
+        return None
+    return y % x
+
+def floor_to_int(x):
+    "Floor the numbers in an array into int64, or None if that's inexact."
+    if is_int(x):
+        return x
+    if is_object(x) or not numpy.isfinite(x).all():
+        return None
+    floored = numpy.floor(x)
+    if floored.size and abs(floored).max() >= 2**62:
+        return None
+    return floored.astype(numpy.int64)
+
+def kernel_floor(x):
+    return floor_to_int(x)
+
+def kernel_ceil(x):
+    if is_float(x):
+        floored = floor_to_int(-x)
+        return None if floored is None else -floored
+    return floor_to_int(x)
+
+def kernel_xor(x, y):
+    if is_float(x) or is_float(y):
+        return None
+    return x ^ y
+
+# Arithmetic of numeric ranges.
+# Negating a Range, adding or subtracting another one or an int, and
+# multiplying it by a nonzero int give another arithmetic progression, so
+# these functions return a lazy Range instead of computing the numbers.
+# A map returns the new Python range, or None if the caller should compute
+# the result another way.
+
+def int_value(value):
+    "The int of a numeric atom, or None."
+    if is_atom(value) and value.type == AtomType.num and value.value.__class__ is int:
+        return value.value
+    return None
+
+def num_range(value):
+    "The Python range of a numeric Range, or None."
+    if isinstance(value, Range) and value.type == AtomType.num:
+        return value.range
+    return None
+
+def progression(first, step, length):
+    "The range of length numbers from first by step, or None if step is 0."
+    if step == 0:
+        return None
+    return range(first, first + step*length, step)
+
+def range_unary(map_range):
+    "Compute a 0-threaded unary function on a numeric Range with map_range."
+    def decorate(f):
+        def range_f(a):
+            numbers = num_range(a)
+            if numbers is not None:
+                result = map_range(numbers)
+                if result is not None:
+                    return from_range(AtomType.num, result)
+            return f(a)
+        return range_f
+    return decorate
+
+def range_binary(map_range):
+    """Compute a 0-threaded binary function with map_range(x, y) when one
+    argument is a numeric Range and the other is an int or a numeric Range;
+    x and y are the Python ranges or ints of the arguments."""
+    def decorate(f):
+        def range_f(a, b):
+            x, y = num_range(a), num_range(b)
+            if x is not None or y is not None:
+                if x is None:
+                    x = int_value(a)
+                if y is None:
+                    y = int_value(b)
+                if x is not None and y is not None:
+                    result = map_range(x, y)
+                    if result is not None:
+                        return from_range(AtomType.num, result)
+            return f(a, b)
+        return range_f
+    return decorate
+
+def linear(x):
+    "The first number, step and length of a range, or of an int repeated."
+    if isinstance(x, range):
+        return x.start, x.step, len(x)
+    return x, 0, None
+
+def combine(x, y, sign):
+    "The range of x + sign*y, threaded like a 0-threaded function."
+    first_x, step_x, length_x = linear(x)
+    first_y, step_y, length_y = linear(y)
+    lengths = [length for length in (length_x, length_y) if length is not None]
+    return progression(first_x + sign*first_y, step_x + sign*step_y, min(lengths))
+
+def range_negate(x):
+    return progression(-x.start, -x.step, len(x))
+
+def range_abs(x):
+    if x.start >= 0 and x[-1] >= 0:
+        return x
+    if x.start <= 0 and x[-1] <= 0:
+        return range_negate(x)
+    return None
+
+def range_add(x, y):
+    return combine(x, y, 1)
+
+def range_subtract(x, y):
+    return combine(y, x, -1)
+
+def range_multiply(x, y):
+    if isinstance(x, range) and isinstance(y, range):
+        # Not an arithmetic progression
+        return None
+    if isinstance(y, range):
+        x, y = y, x
+    return progression(x.start * y, x.step * y, len(x))
+
+def repeat_ndarray(a, b):
+    """The items of b, each repeated by the corresponding int of a, as an
+    ndarray, or None. If b is a numeric Range, only the numbers of the items
+    that are kept are computed."""
+    if not isinstance(b, NumArray) and num_range(b) is None:
+        return None
+    counts = to_ndarray(a)
+    if counts is None or not is_int(counts) or counts.ndim != 1:
+        return None
+    counts = counts[:len(b)]
+    if counts.size and counts.min() < 0:
+        counts = numpy.maximum(counts, 0)
+    if counts.size and counts.max() <= 1:
+        indices = numpy.flatnonzero(counts)
+    else:
+        indices = numpy.repeat(numpy.arange(len(counts)), counts)
+    if isinstance(b, NumArray):
+        return b.array[indices]
+    numbers = b.range
+    if max(abs(numbers[0]), abs(numbers[-1])) >= int_bound // 2:
+        return None
+    return numbers.start + numbers.step * indices
+
+# Folds of associative functions over whole lists.
+# A fold kernel returns the result of folding a list with at least two items
+# from left to right, or None if the caller should fold it item by item.
+# Lists of atoms are folded over their values without creating atoms,
+# numeric arrays along their first axis with NumPy, and Ranges in closed
+# form where there is one, or else over their Python range.
+
+def fold_values(array):
+    "The values of a list of atoms and the type of the first one, or None."
+    if isinstance(array, NumArray):
+        if array.array.ndim != 1:
+            return None
+        return array.array.tolist(), AtomType.num
+    if isinstance(array, Range):
+        return array.range, array.type
+    if not all(map(is_atom, array)):
+        return None
+    return [item.value for item in array], array[0].type
+
+def fold_arithmetic(op, kernel, range_fold=None):
+    """A fold kernel for a 0-threaded mathy function computing op.
+    range_fold computes the fold of a Python range, or returns None."""
+    def fold(array):
+        if range_fold is not None and isinstance(array, Range):
+            result = range_fold(array.range)
+            if result is not None:
+                return Atom(array.type, result)
+        if vectorize and isinstance(array, NumArray) and array.array.ndim == 1:
+            # Without making a list of the numbers
+            with numpy.errstate(all='ignore'):
+                result = kernel(array.array)
+            if result is not None:
+                return to_num_atom(from_numpy_scalar(result))
+        values = fold_values(array)
+        if values is not None:
+            values, type = values
+            return Atom(type, functools.reduce(op, values))
+        if vectorize:
+            x = to_ndarray(array)
+            if x is not None and x.ndim > 1:
+                with numpy.errstate(all='ignore'):
+                    result = kernel(x)
+                if result is not None:
+                    return from_ndarray(result)
+        return None
+    return fold
+
+def fold_kernel_add(x):
+    if is_float(x):
+        # Add the rows in order, like the item by item fold
+        return numpy.add.accumulate(x)[-1]
+    if is_int(x) and magnitude(x) * len(x) >= int_bound:
+        x = promote(x)
+    return numpy.add.reduce(x)
+
+def fold_kernel_multiply(x):
+    if is_float(x):
+        return numpy.multiply.accumulate(x)[-1]
+    if is_int(x) and magnitude(x).bit_length() * len(x) >= 63:
+        x = promote(x)
+    return numpy.multiply.reduce(x)
+
+def fold_kernel_xor(x):
+    if is_float(x):
+        return None
+    return numpy.bitwise_xor.reduce(x)
+
+def range_sum(x):
+    return len(x) * (x[0] + x[-1]) // 2
+
+def zero_in_range(x):
+    return 0 if 0 in x else None
+
+fold_add = fold_arithmetic(operator.add, fold_kernel_add, range_sum)
+fold_multiply = fold_arithmetic(operator.mul, fold_kernel_multiply, zero_in_range)
+fold_xor = fold_arithmetic(operator.xor, fold_kernel_xor)
+
+def fold_extremum(select):
+    "A fold kernel for min or max of atoms; lists compare cheaply item by item."
+    def fold(array):
+        if isinstance(array, Range):
+            # Ranges are monotonic and have no equal items
+            numbers = array.range
+            return array[select((0, -1), key=lambda i: numbers[i])]
+        values = fold_values(array)
+        if values is None:
+            return None
+        values = values[0]
+        if any(x != x for x in values):
+            return None
+        # Like the fold, min and max keep the first of equal items
+        return array[select(range(len(values)), key=values.__getitem__)]
+    return fold
+
+fold_min = fold_extremum(min)
+fold_max = fold_extremum(max)
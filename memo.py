@@ -0,0 +1,144 @@
+from interpreter import *
+from collections import OrderedDict
+import itertools
+import sys
+
+# Memoization of the functions of a program.
+# The functions of the function items, and the functions that the operator
+# items build, are wrapped so that their results are kept in a table shared
+# by all of them, keyed by the function and by exact keys of the arguments.
+# A function built by an operator is identified by its cell and the keys of
+# the operator's inputs, so that its results are reused when the program is
+# run again. The least recently used results are dropped when the table has
+# too many results or its keys too many atoms in all. A result isn't kept if
+# an impure primitive was called while computing it, so those calls are
+# repeated, and calls with arguments too large to be keyed cheaply aren't
+# memoized.
+
+max_key_size = 2**12
+# Returned by arg_key for arguments that aren't memoized
+unkeyable = object()
+missing = object()
+
+def key_size(value, limit):
+    """The number of atoms and lists in value, or a number over limit if it
+    has more. Only the items of lists of unknown shape are looked at."""
+    if is_atom(value):
+        return 1
+    if isinstance(value, NumArray):
+        return 1 + value.array.size
+    if isinstance(value, VirtualList):
+        known_shape = value.known_shape()
+        if known_shape is not None:
+            size = 1
+            for dim in known_shape:
+                size *= dim
+            return 1 + size
+        if len(value) > limit:
+            return 1 + len(value)
+    size = 1
+    for item in value:
+        size += key_size(item, limit - size)
+        if size > limit:
+            break
+    return size
+
+def arg_key(value):
+    "The key of an argument and its size, or unkeyable and 0."
+    if value is None:
+        return (None, 0)
+    if callable(value):
+        return (unkeyable, 0)
+    size = key_size(value, max_key_size)
+    if size > max_key_size:
+        return (unkeyable, 0)
+    if isinstance(value, NumArray) and value.array.dtype != object:
+        array = value.array
+        return (('array', array.dtype.str, array.shape, array.tobytes()), size)
+    return (exact_key(value), size)
+
+def input_key(value):
+    "The key of an input of an operator and its size, or unkeyable and 0."
+    if callable(value):
+        # It may be wrapped by a profiler
+        while not hasattr(value, 'memo_id') and hasattr(value, '__wrapped__'):
+            value = value.__wrapped__
+        return (getattr(value, 'memo_id', unkeyable), 1)
+    return arg_key(value)
+
+class Memo:
+    """A table of the results of the functions of a program, with
+    statistics, bounded by the number of results and the size of their keys."""
+
+    def __init__(self, max_size=2**16, max_key_total=2**22):
+        self.max_size = max_size
+        self.max_key_total = max_key_total
+        # The values of the keys, with the sizes of the keys
+        self.table = OrderedDict()
+        self.key_total = 0
+        self.ids = itertools.count()
+        self.hits = self.misses = self.impure = self.skipped = 0
+
+    def instrument(self, items):
+        "Wrap the functions of the items returned by parse."
+        for (pos, (item, _, _)) in items.items():
+            if item.type == ItemType.function:
+                item.content = self.wrap(item.content)
+            elif item.type == ItemType.operator:
+                item.content = self.wrap_operator(pos, item.content)
+
+    def wrap(self, f, function_id=None, id_size=1):
+        """Memoize the calls of f. Its results are keyed by function_id, a
+        new one by default, which counts as id_size atoms."""
+        if function_id is None:
+            function_id = next(self.ids)
+        table = self.table
+        def memoized(a=None, b=None):
+            key_a, size_a = arg_key(a)
+            key_b, size_b = arg_key(b)
+            if key_a is unkeyable or key_b is unkeyable:
+                self.skipped += 1
+                return f(a, b)
+            key = (function_id, key_a, key_b)
+            entry = table.get(key, missing)
+            if entry is not missing:
+                self.hits += 1
+                table.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+            impure_calls = purity.impure_calls
+            value = f(a, b)
+            if purity.impure_calls != impure_calls:
+                self.impure += 1
+            else:
+                size = id_size + size_a + size_b
+                table[key] = (value, size)
+                self.key_total += size
+                while len(table) > self.max_size or self.key_total > self.max_key_total:
+                    self.key_total -= table.popitem(last=False)[1][1]
+            return value
+        # Lets the fold kernels recognize the primitive
+        memoized.__wrapped__ = f
+        memoized.memo_id = function_id
+        return memoized
+
+    def wrap_operator(self, pos, oper):
+        "Memoize the calls of the functions that oper, the operator at pos, builds."
+        def memoized_operator(l_input, r_input):
+            func = oper(l_input, r_input)
+            if not callable(func):
+                return func
+            key_l, size_l = input_key(l_input)
+            key_r, size_r = input_key(r_input)
+            if key_l is unkeyable or key_r is unkeyable:
+                return self.wrap(func)
+            return self.wrap(func, (pos, key_l, key_r), 1 + size_l + size_r)
+        return memoized_operator
+
+    def summary(self):
+        return "memo: {} hits, {} misses, {} impure, {} not keyed, {} of {} results kept".format(
+            self.hits, self.misses, self.impure, self.skipped, len(self.table), self.max_size)
+
+    def write_summary(self, stream=None):
+        stream = sys.stderr if stream is None else stream
+        stream.write(self.summary() + "\n")
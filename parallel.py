@@ -0,0 +1,113 @@
+import multiprocessing
+import pickle
+import time
+
+# Parallel maps for threaded functions.
+# A long map starts in the calling process, and if its other calls are
+# estimated to take over parallel.min_time seconds, they are split into
+# contiguous chunks that a pool of forked worker processes runs. The workers
+# inherit the function and its arguments, so only the results are sent back,
+# and they are put together in order. This assumes that the function is pure:
+# impure primitives call check_pure, which fails in a worker, and then the
+# calls are made in the calling process instead, as are the calls of any
+# chunk that fails, so errors are raised as they would be without workers.
+
+class ParallelOptions:
+    """Options of map_parallel. With workers > 1, maps of at least min_items
+    calls are run by that many worker processes when the calls left after
+    the first ones are estimated to take over min_time seconds. Each call
+    must also take over min_call_time seconds, and longer than sending its
+    result back takes transfer_ratio times, as estimated by pickling the
+    result of the last of the first calls."""
+
+    def __init__(self, workers=1, min_time=0.1, min_items=16, min_call_time=5e-5,
+                 transfer_ratio=2, chunks_per_worker=4):
+        self.workers = workers
+        self.min_time = min_time
+        self.min_items = min_items
+        self.min_call_time = min_call_time
+        self.transfer_ratio = transfer_ratio
+        self.chunks_per_worker = chunks_per_worker
+        self.in_worker = False
+
+parallel = ParallelOptions()
+
+class Purity:
+    "Counts the calls of impure primitives, so that callers can tell whether a call made any."
+
+    def __init__(self):
+        self.impure_calls = 0
+
+purity = Purity()
+
+class ImpureCall(Exception):
+    "Raised by check_pure in a worker process."
+
+def check_pure():
+    """Called by impure primitives, which can't run in a worker process,
+    and whose callers' results can't be reused."""
+    purity.impure_calls += 1
+    if parallel.in_worker:
+        raise ImpureCall()
+
+# The function and arguments of the running parallel map, inherited by the workers
+task = None
+
+def start_worker():
+    parallel.in_worker = True
+
+def run_chunk(bounds):
+    f, args = task
+    return [f(*arg) for arg in args[bounds[0]:bounds[1]]]
+
+def can_fork():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+def transfer_time(value):
+    "The time it takes to pickle and unpickle value, or infinity if it can't be pickled."
+    start = time.perf_counter()
+    try:
+        pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return float('inf')
+    return time.perf_counter() - start
+
+def map_parallel(f, args):
+    "The list of the values of f on each tuple of arguments in args, in order."
+    workers = parallel.workers
+    if workers <= 1 or parallel.in_worker or len(args) < max(2, parallel.min_items):
+        return [f(*arg) for arg in args]
+    # Time the first calls to estimate the others
+    results = []
+    start = time.perf_counter()
+    elapsed = 0.0
+    while not results or len(results) < parallel.min_items and elapsed < parallel.min_time:
+        results.append(f(*args[len(results)]))
+        elapsed = time.perf_counter() - start
+    call_time = elapsed / len(results)
+    left = len(args) - len(results)
+    if (call_time * left > parallel.min_time and call_time > parallel.min_call_time and can_fork()
+            and call_time > parallel.transfer_ratio * transfer_time(results[-1])):
+        results.extend(run_pool(f, args, len(results), workers))
+    results.extend(f(*arg) for arg in args[len(results):])
+    return results
+
+def run_pool(f, args, start, workers):
+    """Generate the values of f on args[start:] with a pool of workers, in
+    order, until the first chunk that fails."""
+    global task
+    chunk_count = min(len(args) - start, workers * parallel.chunks_per_worker)
+    bounds = [(start + (len(args) - start) * i // chunk_count,
+               start + (len(args) - start) * (i + 1) // chunk_count)
+              for i in range(chunk_count)]
+    task = (f, args)
+    pool = multiprocessing.get_context('fork').Pool(workers, initializer=start_worker)
+    try:
+        for chunk in pool.imap(run_chunk, bounds):
+            yield from chunk
+    except Exception:
+        # The caller makes the calls that are left
+        return
+    finally:
+        pool.terminate()
+        task = None
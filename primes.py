@@ -0,0 +1,193 @@
+import array
+import math
+
+# Integer factorization.
+# Numbers covered by a sieve of smallest prime factors, which is extended on
+# demand, are factored by looking their factors up. Larger numbers are
+# trial divided by small primes, and the rest is split with Pollard's rho
+# and tested with Miller-Rabin; these factorizations are kept in a bounded
+# memo table shared by all calls.
+
+max_sieve_size = 2**22
+trial_bound = 2**10
+# Miller-Rabin with these bases is exact below this bound
+mr_bases = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+mr_bound = 3317044064679887385961981
+rho_batch = 128
+
+# sieve[n] is the smallest prime factor of n, or 0 if n is a prime or n < 2
+sieve = array.array('I')
+small_primes = []
+
+factorizations = {}
+max_factorizations = 2**12
+
+def extend_sieve(size):
+    "Make the sieve cover the numbers below size, which is at most max_sieve_size."
+    global sieve, small_primes
+    if size <= len(sieve):
+        return
+    size = min(max(size, 2 * len(sieve), 2**16), max_sieve_size)
+    flags = bytearray([1]) * size
+    flags[0:2] = b'\0\0'
+    for p in range(2, math.isqrt(size - 1) + 1):
+        if flags[p]:
+            flags[p*p::p] = bytes(len(range(p*p, size, p)))
+    factors = array.array('I', bytes(4 * size))
+    # Going down, the smallest prime factor is written last
+    for p in reversed(range(2, math.isqrt(size - 1) + 1)):
+        if flags[p]:
+            factors[p*p::p] = array.array('I', [p]) * len(range(p*p, size, p))
+    sieve = factors
+    small_primes = [p for p in range(2, trial_bound) if flags[p]]
+
+def is_prime(n):
+    "Whether n is a prime; exact below mr_bound, a BPSW test above it."
+    if n < 2:
+        return False
+    if n < len(sieve):
+        return not sieve[n]
+    for p in mr_bases:
+        if n % p == 0:
+            return n == p
+    if n < mr_bound:
+        return all(strong_probable_prime(n, base) for base in mr_bases)
+    return strong_probable_prime(n, 2) and strong_lucas_probable_prime(n)
+
+def strong_probable_prime(n, base):
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    x = pow(base, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+def jacobi(a, n):
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+def strong_lucas_probable_prime(n):
+    "The strong Lucas test with Selfridge's parameters, for odd n that is not a square."
+    if math.isqrt(n)**2 == n:
+        return False
+    d = 5
+    while True:
+        j = jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    q = (1 - d) // 4
+    k = n + 1
+    s = 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+    # Compute U_k, V_k and Q^k by the binary expansion of k
+    half = (n + 1) // 2
+    u, v, qk = 1, 1, q % n
+    for bit in bin(k)[3:]:
+        u, v = u * v % n, (v * v - 2 * qk) % n
+        qk = qk * qk % n
+        if bit == '1':
+            u, v = (u + v) * half % n, (d * u + v) * half % n
+            qk = qk * q % n
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v = (v * v - 2 * qk) % n
+        qk = qk * qk % n
+        if v == 0:
+            return True
+    return False
+
+def rho_divisor(n):
+    "A nontrivial divisor of an odd composite n, by Brent's variant of Pollard's rho."
+    for c in range(1, n):
+        y, r, m, g = 2, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(rho_batch, r - k)):
+                    y = (y * y + c) % n
+                    m = m * abs(x - y) % n
+                g = math.gcd(m, n)
+                k += rho_batch
+            r *= 2
+        if g == n:
+            # The batch overshot; redo it one step at a time
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+def split(n, factors):
+    "Append the prime factors of n, which has no factors below trial_bound."
+    if n == 1:
+        return
+    if is_prime(n):
+        factors.append(n)
+        return
+    root = math.isqrt(n)
+    if root * root == n:
+        split(root, factors)
+        split(root, factors)
+        return
+    d = rho_divisor(n)
+    split(d, factors)
+    split(n // d, factors)
+
+def prime_factors(n):
+    "The prime factors of an integer n > 0 in increasing order, with multiplicity."
+    if n >= len(sieve):
+        extend_sieve(n + 1 if n < max_sieve_size else trial_bound)
+    factors = []
+    if n < len(sieve):
+        while n > 1:
+            p = sieve[n] or n
+            factors.append(p)
+            n //= p
+        return factors
+    for p in small_primes:
+        if p * p > n:
+            break
+        while n % p == 0:
+            n //= p
+            factors.append(p)
+    if n < len(sieve):
+        factors.extend(prime_factors(n))
+        return factors
+    cached = factorizations.get(n)
+    if cached is None:
+        large = []
+        split(n, large)
+        cached = tuple(sorted(large))
+        if len(factorizations) >= max_factorizations:
+            del factorizations[next(iter(factorizations))]
+        factorizations[n] = cached
+    factors.extend(cached)
+    return factors
@@ -1,123 +1,457 @@
 from utils import *
+import array
+import atexit
+import operator
 import re
+import struct
+import sys
+
+# Output.
+# Values are converted into text piece by piece, and the pieces are passed
+# to a write function, so that large values can be printed without building
+# their whole textual form in memory. Printed text goes through the buffered
+# writer output, which is flushed when the buffer is full, after every print
+# if flush_each is set, before reading input, and at exit.
+
+class OutputWriter:
+    """A buffered writer for STDOUT, or for the given text stream.
+    Text is encoded with the stream's encoding and the surrogateescape error
+    handler, so that the characters U+DC80 to U+DCFF are written as the
+    bytes 0x80 to 0xFF."""
+
+    def __init__(self, stream=None, buffer_size=2**16, flush_each=False):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_each = flush_each
+        self.pieces = []
+        self.size = 0
+
+    def write(self, text):
+        self.pieces.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pieces:
+            return
+        text = "".join(self.pieces)
+        self.pieces = []
+        self.size = 0
+        stream = sys.stdout if self.stream is None else self.stream
+        binary = getattr(stream, 'buffer', None)
+        if binary is None:
+            stream.write(text)
+        else:
+            # Keep the order of anything written through the text layer
+            stream.flush()
+            binary.write(text.encode(stream.encoding or 'utf-8', 'surrogateescape'))
+            binary.flush()
+
+    def print_value(self, value, matrix=False):
+        """Write the textual form of a value followed by a newline.
+        It's formatted before any of it is written, so nothing is written
+        if formatting fails."""
+        pieces = []
+        if matrix:
+            write_matrix(value, pieces.append)
+        else:
+            write_pretty(value, pieces.append)
+        pieces.append("\n")
+        self.pieces.extend(pieces)
+        self.size += sum(map(len, pieces))
+        if self.flush_each or self.size >= self.buffer_size:
+            self.flush()
+
+output = OutputWriter()
+atexit.register(output.flush)
+
+# Number of characters converted at once when writing strings
+chunk_length = 2**12
+
+def atom_string(atom, quotes):
+    if atom.type == AtomType.num:
+        return str(atom.value)
+    else:
+        return "'"*quotes + chr(abs(int(atom.value))) + "'"*quotes
+
+def is_string(value):
+    "Whether a list is printed as a string, which is when all its items are characters."
+    if isinstance(value, NumArray):
+        return False
+    return all(is_atom(item) and item.type == AtomType.char for item in value)
+
+def chars_string(atoms):
+    return "".join(map(chr, map(abs, map(int, map(operator.attrgetter('value'), atoms)))))
+
+def write_pretty(value, write, quotes=True):
+    "Write the human-readable form of a value using the write function."
+    if is_atom(value):
+        write(atom_string(value, quotes))
+    elif is_string(value):
+        write('"')
+        for start in range(0, len(value), chunk_length):
+            write(chars_string(value[start:start+chunk_length]))
+        write('"')
+    elif isinstance(value, NumArray) and value.array.ndim == 1:
+        write("[")
+        numbers = value.array.tolist()
+        for start in range(0, len(numbers), chunk_length):
+            if start:
+                write(" ")
+            write(" ".join(map(str, numbers[start:start+chunk_length])))
+        write("]")
+    elif all(is_atom(item) for item in value):
+        write("[")
+        for start in range(0, len(value), chunk_length):
+            if start:
+                write(" ")
+            write(" ".join(atom_string(item, True) for item in value[start:start+chunk_length]))
+        write("]")
+    else:
+        write("[")
+        for (index, item) in enumerate(value):
+            if index:
+                write(" ")
+            write_pretty(item, write)
+        write("]")
 
 def prettyprint(value, quotes=True):
     "Convert a value into a human-readable string."
+    pieces = []
+    write_pretty(value, pieces.append, quotes)
+    return "".join(pieces)
+
+def matrix_pads(value, heights):
+    """Compute the column widths of a value in the grid-style format in one pass
+    over its rows, and whether it's printed with quotes."""
+    num_widths = []
+    char_columns = set()
+    chars_only = True
+    for row in flatten(value, 1, heights):
+        if isinstance(row, NumArray):
+            lengths = map(len, map(str, row.array.tolist()))
+            chars_only = False
+        else:
+            lengths = [len(str(atom.value)) if atom.type == AtomType.num else 0 for atom in row]
+            chars = [index for (index, atom) in enumerate(row) if atom.type == AtomType.char]
+            char_columns.update(chars)
+            if len(chars) < len(row):
+                chars_only = False
+        if len(row) > len(num_widths):
+            num_widths += [0] * (len(row) - len(num_widths))
+        num_widths[:len(row)] = map(max, num_widths, lengths)
+    quotes = not chars_only
+    pads = [1 + width for width in num_widths]
+    if quotes:
+        for index in char_columns:
+            pads[index] = max(pads[index], 4)
+        pads[0] -= 1
+    return pads, quotes
+
+def write_matrix(value, write):
+    "Write the grid-style form of a value using the write function."
     if is_atom(value):
-        if value.type == AtomType.num:
-            return str(value.value)
+        write_pretty(value, write)
+        return
+    heights = {}
+    pads, quotes = matrix_pads(value, heights)
+    write_matrix_rows(value, height(value, heights), pads, quotes, write)
+
+def write_matrix_rows(value, level, pads, quotes, write):
+    if level == 1:
+        if isinstance(value, NumArray):
+            items = value.array.tolist()
+            write("".join(str(number).rjust(pad) for (number, pad) in zip(items, pads)))
         else:
-            return "'"*quotes + chr(abs(int(value.value))) + "'"*quotes
-    all_chars = all(atom.type == AtomType.char for atom in flatten(value))
-    if all_chars and height(value) == 1:
-        return '"' + ''.join(prettyprint(item, quotes=False) for item in value) + '"'
+            write("".join(atom_string(item, quotes).rjust(pad) for (item, pad) in zip(value, pads)))
     else:
-        return "[" + " ".join(prettyprint(item) for item in value) + "]"
+        for (index, item) in enumerate(value):
+            if index:
+                write("\n"*(level-1))
+            write_matrix_rows(item, level-1, pads, quotes, write)
 
 def matrix_print(value):
     "Convert a value into a beautiful grid-style string."
-    if is_atom(value):
-        return prettyprint(value)
-    level = height(value)
-    flat = flatten(value)
-    rows = flatten(value, 1)
-    max_len = max(len(row) for row in rows)
-    all_chars = all(atom.type == AtomType.char for atom in flat)
-    pads = [1 + max(print_len(row[i], not all_chars) if i < len(row) else 0
-                    for row in rows)
-            for i in range(max_len)]
-    if not all_chars:
-        pads[0] -= 1
-    return matrix_print_aux(value, level, pads, not all_chars)
+    pieces = []
+    write_matrix(value, pieces.append)
+    return "".join(pieces)
 
-def print_len(atom, quotes):
-    if atom.type == AtomType.num:
-        return len(str(atom.value))
-    else:
-        return 3*quotes
+# Tokens of the input format
+whitespace = re.compile(r"\s*")
+number_token = re.compile(r"(-?)([0-9]*(?:\.[0-9]*)?)(?:e(-?)([0-9]*(?:\.[0-9]*)?))?")
+escaped_char_token = re.compile(r"'\\(.)'", re.DOTALL)
+char_token = re.compile(r"'(.)'", re.DOTALL)
+string_token = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+# A run of integers separated by whitespace, parsed at once inside arrays,
+# and the start of a number, which decides whether the run can match
+int_run = re.compile(r"-?[0-9]+(?![0-9.e])(?:\s+-?[0-9]+(?![0-9.e]))*")
+number_start = re.compile(r"-?[0-9]*")
+string_escape = re.compile(r"\\(.)", re.DOTALL)
 
-def matrix_print_aux(value, level, pads, quotes):
-    if level == 1:
-        string = ""
-        for index, item in enumerate(value):
-            if item.type == AtomType.num:
-                string += str(item.value).rjust(pads[index])
-            else:
-                char = chr(abs(int(item.value)))
-                string += ("'"*quotes + char + "'"*quotes).rjust(pads[index])
-        return string
-    else:
-        item_strings = [matrix_print_aux(item, level-1, pads, quotes)
-                        for item in value]
-        return ("\n"*(level-1)).join(item_strings)
-        
-def parse_value(string):
-    digits = "0123456789"
-    string = string.lstrip()
-    if string[0] in '-.e' + digits:
-        neg = string[0] == '-'
-        j = j0 = 1 if neg else 0
-        while j < len(string) and string[j] in digits:
-            j += 1
-        if j < len(string) and string[j] == '.':
-            dec = True
-            j += 1
-            while j < len(string) and string[j] in digits:
-                j += 1
+def unescape(match):
+    char = match.group(1)
+    return '\n' if char == 'n' else char
+
+class ValueParser:
+    """A parser for values in the input format.
+    The source is a string or a file object, which is read in chunks.
+    The parser keeps a cursor into a buffer instead of slicing the input
+    after each token, so parsing takes linear time."""
+
+    chunk_size = 2**16
+
+    def __init__(self, source):
+        if isinstance(source, str):
+            self.buffer, self.file = source, None
         else:
-            dec = False
-        j1 = j
-        if j < len(string) and string[j] == 'e':
-            exp = True
-            j += 1
-            neg_exp = j < len(string) and string[j] == '-'
-            j = j2 = j+1 if neg_exp else j
-            while j < len(string) and string[j] in digits:
-                j += 1
-            if j < len(string) and string[j] == '.':
-                dec_exp = True
-                j += 1
-                while j < len(string) and string[j] in digits:
-                    j += 1
+            self.buffer, self.file = "", source
+        self.pos = 0
+        # Line number and start of the line of the first character in the buffer
+        self.line = 1
+        self.line_start = 0
+        self.offset = 0
+
+    def read_more(self):
+        "Read at least as much as is left in the buffer, or return False at the end of the file."
+        if self.file is None:
+            return False
+        data = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not data:
+            self.file = None
+            return False
+        if self.pos > len(self.buffer) // 2:
+            # Drop the parsed part of the buffer
+            dropped = self.buffer[:self.pos]
+            newlines = dropped.count('\n')
+            if newlines:
+                self.line += newlines
+                self.line_start = self.offset + dropped.rindex('\n') + 1
+            self.offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += data
+        return True
+
+    def match(self, pattern, length=None):
+        """Match a pattern at the cursor, reading more if the match could
+        continue. A failed match reads more only if fewer than length
+        characters are left, as it fails for good on length characters;
+        None means that no number of characters is enough."""
+        while True:
+            match = pattern.match(self.buffer, self.pos)
+            if match is None:
+                more = length is None or len(self.buffer) - self.pos < length
             else:
-                dec_exp = False
-        else:
-            exp = False
-        multiplier = (-1 if neg else 1) * (float if dec else int)(string[j0:j1])
-        if exp:
-            exponent = (-1 if neg_exp else 1) * (float if dec_exp else int)(string[j2:j])
+                more = match.end() == len(self.buffer)
+            if more and self.read_more():
+                continue
+            return match
+
+    def peek(self):
+        "Skip whitespace and return the next character, or '' at the end of the input."
+        self.pos = self.match(whitespace).end()
+        if self.pos == len(self.buffer) and not self.read_more():
+            return ''
+        return self.buffer[self.pos]
+
+    def error(self, expected):
+        prefix = self.buffer[:self.pos]
+        newlines = prefix.count('\n')
+        if newlines:
+            line = self.line + newlines
+            column = self.pos - prefix.rindex('\n')
         else:
-            exponent = 0
-        return to_num_atom(multiplier * 10**exponent), string[j:]
-    elif string[0] == "'":
-        if string[1] == '\\' and string[3] == "'":
-            char = string[2]
-            if char == 'n':
-                char == '\n'
-            j = 4
-        elif string[2] == "'":
-            char = string[1]
-            j = 3
-        return to_char_atom(char), string[j:]
-    elif string[0] == '"':
-        parsed_string = ""
-        j = 1
-        while string[j] != '"':
-            if string[j] == '\\':
-                char = string[j+1]
-                if char == 'n':
-                    char = '\n'
-                parsed_string += char
-                j += 2
+            line = self.line
+            column = self.offset + self.pos - self.line_start + 1
+        found = repr(self.buffer[self.pos]) if self.pos < len(self.buffer) else "end of input"
+        raise Exception("Invalid input at line {}, column {}: expected {}, found {}.".format(
+            line, column, expected, found))
+
+    def parse_number(self):
+        match = self.match(number_token)
+        neg, mantissa, neg_exp, exponent = match.groups()
+        try:
+            multiplier = (-1 if neg else 1) * (float if '.' in mantissa else int)(mantissa)
+            if exponent is None:
+                exponent = 0
             else:
-                parsed_string += string[j]
-                j += 1
-        return [to_char_atom(char) for char in parsed_string], string[j+1:]
-    elif string[0] == '[':
-        array = []
-        string = string[1:].lstrip()
-        while string[0] != ']':
-            value, string = parse_value(string)
-            array.append(value)
-            string = string.lstrip()
-        return array, string[1:]
+                exponent = (-1 if neg_exp else 1) * (float if '.' in exponent else int)(exponent)
+        except ValueError:
+            self.error("a number")
+        self.pos = match.end()
+        return to_num_atom(multiplier * 10**exponent)
+
+    def parse_char(self):
+        match = self.match(escaped_char_token, 4) or self.match(char_token, 3)
+        if match is None:
+            self.error("a character literal")
+        self.pos = match.end()
+        return to_char_atom(match.group(1))
+
+    def parse_ints(self):
+        """Parse a run of integers inside an array, or return None if the
+        next number isn't an integer."""
+        # Makes the character after the first number available
+        self.match(number_start)
+        match = int_run.match(self.buffer, self.pos)
+        if match is None:
+            return None
+        text = match.group()
+        if match.end() == len(self.buffer) and self.file is not None:
+            # The last number may continue in the next chunk; it's parsed again
+            text = text[:len(text.rstrip("-0123456789"))].rstrip()
+        self.pos += len(text)
+        return [to_num_atom(int(num)) for num in text.split()]
+
+    def parse_string(self):
+        match = self.match(string_token)
+        if match is None:
+            self.error("a terminated string")
+        self.pos = match.end()
+        return [to_char_atom(char) for char in string_escape.sub(unescape, match.group(1))]
+
+    def parse(self):
+        "Parse the next value, using an explicit stack for nested arrays."
+        arrays = []
+        while True:
+            char = self.peek()
+            if char == '[':
+                self.pos += 1
+                arrays.append([])
+                continue
+            if arrays and char and char in '-0123456789':
+                numbers = self.parse_ints()
+                if numbers is not None:
+                    arrays[-1].extend(numbers)
+                    continue
+            if char == ']' and arrays:
+                self.pos += 1
+                value = arrays.pop()
+            elif char and char in '-.e0123456789':
+                value = self.parse_number()
+            elif char == "'":
+                value = self.parse_char()
+            elif char == '"':
+                value = self.parse_string()
+            else:
+                self.error("a value or ']'" if arrays else "a value")
+            if not arrays:
+                return value
+            arrays[-1].append(value)
+
+    def rest(self):
+        "The unparsed part of the input."
+        if self.file is not None:
+            self.buffer += self.file.read()
+            self.file = None
+        return self.buffer[self.pos:]
+
+def parse_value(string):
+    "Parse a value from the start of a string, returning it and the rest of the string."
+    parser = ValueParser(string)
+    value = parser.parse()
+    return value, parser.rest()
+
+def read_values(file):
+    "Parse the values in a file object, in chunks."
+    parser = ValueParser(file)
+    while parser.peek():
+        yield parser.parse()
+
+# Binary numeric input.
+# A raw binary file starts with a header: the magic bytes JFI8 for int64 data
+# or JFF8 for float64 data, the number of dimensions as a uint32, and each
+# dimension as a uint64, all little-endian. The items follow in row-major
+# order as little-endian int64 or float64. Files named *.npy are read with
+# NumPy. Both are memory-mapped when NumPy is available, so the data is
+# only copied when a function builds a new array from it.
+
+binary_types = {b"JFI8": ('q', '<i8'), b"JFF8": ('d', '<f8')}
+
+def read_binary(path):
+    "Read a raw binary or .npy file of numbers as a value."
+    if path.endswith('.npy'):
+        if numpy is None:
+            raise Exception("Reading .npy files requires NumPy.")
+        return ndarray_input(numpy.load(path, mmap_mode='r'))
+    with open(path, 'rb') as binary_file:
+        header = binary_file.read(8)
+        if len(header) < 8 or header[:4] not in binary_types:
+            raise Exception("{} is not a binary input file.".format(path))
+        typecode, dtype = binary_types[header[:4]]
+        ndim = struct.unpack('<I', header[4:])[0]
+        dims = struct.unpack('<{}Q'.format(ndim), binary_file.read(8*ndim))
+        size = 1
+        for dim in dims:
+            size *= dim
+        if numpy is not None:
+            if size == 0:
+                return ndarray_input(numpy.zeros(dims, dtype=dtype))
+            return ndarray_input(numpy.memmap(path, dtype=dtype, mode='r',
+                                              offset=8 + 8*ndim, shape=dims))
+        data = array.array(typecode)
+        data.frombytes(binary_file.read(8*size))
+    if len(data) < size:
+        raise Exception("{} is shorter than its header says.".format(path))
+    if sys.byteorder == 'big':
+        data.byteswap()
+    value = data.tolist()
+    return from_python(nest_list(value, dims) if dims else value[0])
+
+def nest_list(items, dims):
+    "Split a flat list into nested lists of the dimensions dims, which may be 0."
+    if len(dims) == 1:
+        return items[:dims[0]]
+    inner = 1
+    for dim in dims[1:]:
+        inner *= dim
+    return [nest_list(items[i*inner:(i+1)*inner], dims[1:]) for i in range(dims[0])]
+
+def ndarray_input(data):
+    "Convert a numeric ndarray into a value, without copying int64 and float64 data."
+    data = data.view(numpy.ndarray)
+    if data.dtype.kind in 'biu':
+        if data.dtype.kind == 'u' and data.size and data.max() >= 2**63:
+            data = data.astype(object)
+        elif data.dtype != numpy.int64:
+            data = data.astype(numpy.int64)
+    elif data.dtype.kind == 'f':
+        if data.dtype != numpy.float64:
+            data = data.astype(numpy.float64)
+    else:
+        raise Exception("Binary input must be numeric, not {}.".format(data.dtype))
+    return from_ndarray(data)
+
+def write_binary(path, value):
+    "Write a rectangular array of numbers into a raw binary file."
+    if isinstance(value, NumArray) and value.array.dtype != object:
+        is_float = value.array.dtype == numpy.float64
+        data = value.array.astype('<f8' if is_float else '<i8')
+        with open(path, 'wb') as binary_file:
+            binary_file.write((b"JFF8" if is_float else b"JFI8") +
+                              struct.pack('<I{}Q'.format(data.ndim), data.ndim, *data.shape))
+            binary_file.write(data.tobytes())
+        return
+    dims = shape(value)
+    items = flatten(value)
+    size = 1
+    for dim in dims:
+        size *= dim
+    if len(items) != size:
+        raise Exception("Only rectangular arrays can be written into binary files.")
+    is_float = any(isinstance(item.value, float) for item in items)
+    magic = b"JFF8" if is_float else b"JFI8"
+    data = array.array('d' if is_float else 'q', (item.value for item in items))
+    if sys.byteorder == 'big':
+        data.byteswap()
+    with open(path, 'wb') as binary_file:
+        binary_file.write(magic + struct.pack('<I{}Q'.format(len(dims)), len(dims), *dims))
+        binary_file.write(data.tobytes())
+
+def parse_input(line):
+    """Parse a line of input: a value, or @ followed by the path of a binary file."""
+    stripped = line.strip()
+    if stripped.startswith('@'):
+        return read_binary(stripped[1:])
+    return parse_value(line)[0]
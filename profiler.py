@@ -0,0 +1,151 @@
+from interpreter import *
+import json
+import sys
+import time
+
+# Per-cell profiling of programs.
+# The functions of the function and operator items are wrapped so that every
+# call is attributed to the cell of its item, also when the function is
+# called by an operator in another cell. For each cell, the profiler records
+# the number of calls, the total time spent in them, the self time spent
+# outside the calls of other cells, and the number of elements in the values
+# they return: the number of atoms, which arrays, ranges and other lazy
+# lists with a known shape give without making their items. Lazy lists
+# without one, like the values of an iteration, count as their length so as
+# not to compute them. Building the function of an operator counts as a call.
+
+heat_levels = 9
+# 256-color backgrounds from cold to hot
+heat_colors = [17, 19, 25, 31, 37, 142, 178, 208, 196]
+
+class CellStats:
+    "The profile of one cell."
+
+    __slots__ = ('calls', 'total', 'self', 'elements', 'active')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = self.self = 0.0
+        self.elements = 0
+        self.active = 0
+
+def count_elements(value):
+    "The number of atoms in a value; lazy lists are counted by their shape or length."
+    if is_atom(value):
+        return 1
+    if value is None or callable(value):
+        return 0
+    if isinstance(value, VirtualList):
+        known_shape = value.known_shape()
+        if known_shape is None:
+            return len(value)
+        count = 1
+        for dim in known_shape:
+            count *= dim
+        return count
+    return sum(map(count_elements, value))
+
+class Profiler:
+    "Records the calls of the cells of a program."
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.cells = {}
+        # The time spent in the calls made by each active call
+        self.stack = []
+
+    def instrument(self, items):
+        "Wrap the functions of the items returned by parse."
+        for (pos, (item, _, _)) in items.items():
+            if item.type == ItemType.function:
+                item.content = self.wrap(pos, item.content)
+            elif item.type == ItemType.operator:
+                item.content = self.wrap_operator(pos, item.content)
+
+    def wrap(self, pos, f):
+        "Attribute the calls of f to the cell at pos."
+        stats = self.cells.setdefault(pos, CellStats())
+        clock, stack = self.clock, self.stack
+        def profiled(*args):
+            stack.append(0.0)
+            stats.active += 1
+            start = clock()
+            try:
+                value = f(*args)
+            finally:
+                elapsed = clock() - start
+                inner = stack.pop()
+                stats.active -= 1
+                stats.calls += 1
+                stats.self += elapsed - inner
+                if not stats.active:
+                    stats.total += elapsed
+            count_start = clock()
+            stats.elements += count_elements(value)
+            if stack:
+                # Don't charge the caller for this call or for counting
+                stack[-1] += elapsed + (clock() - count_start)
+            return value
+        # Lets the fold kernels recognize the primitive
+        profiled.__wrapped__ = f
+        return profiled
+
+    def wrap_operator(self, pos, oper):
+        "Attribute building the function of an operator, and the calls of that function."
+        built = self.wrap(pos, oper)
+        def profiled_operator(l_input, r_input):
+            func = built(l_input, r_input)
+            return self.wrap(pos, func) if callable(func) else func
+        return profiled_operator
+
+    def report(self, matrix):
+        "The profile as a JSON-compatible dict."
+        cells = []
+        for ((x, y), stats) in sorted(self.cells.items(), key=lambda cell: (cell[0][1], cell[0][0])):
+            if stats.calls:
+                cells.append({'x': x, 'y': y, 'char': matrix[y][x], 'calls': stats.calls,
+                              'total': stats.total, 'self': stats.self, 'elements': stats.elements})
+        return {'time': sum(cell['self'] for cell in cells), 'cells': cells}
+
+    def write_json(self, matrix, path):
+        with open(path, 'w') as report_file:
+            json.dump(self.report(matrix), report_file, indent=1)
+            report_file.write("\n")
+
+    def heat(self):
+        "The heat level of each cell, from 1 to heat_levels, by its share of the largest self time."
+        hottest = max((stats.self for stats in self.cells.values() if stats.calls), default=0)
+        return {pos: 1 + int((heat_levels - 1) * stats.self / hottest) if hottest > 0 else 1
+                for (pos, stats) in self.cells.items() if stats.calls}
+
+    def heatmap(self, matrix, color=False):
+        """The source grid with the heat of each profiled cell, either as
+        colored characters or as digits next to each line."""
+        heat = self.heat()
+        width = max(map(len, matrix), default=0)
+        lines = []
+        for (y, row) in enumerate(matrix):
+            if color:
+                lines.append("".join("\x1b[48;5;{}m{}\x1b[0m".format(heat_colors[heat[(x, y)] - 1], char)
+                                     if (x, y) in heat else char
+                                     for (x, char) in enumerate(row)))
+            else:
+                heat_row = "".join(str(heat[(x, y)]) if (x, y) in heat else ' ' if char == ' ' else '.'
+                                   for (x, char) in enumerate(row))
+                lines.append("{}  |  {}".format(row.ljust(width), heat_row.rstrip()))
+        return "\n".join(lines)
+
+    def table(self, matrix, limit=20):
+        "The cells with the most self time, one per line."
+        cells = sorted(self.report(matrix)['cells'], key=lambda cell: -cell['self'])[:limit]
+        lines = ["{:>5} {:>5}  char {:>10} {:>10} {:>10} {:>12}".format(
+                     "x", "y", "calls", "total (s)", "self (s)", "elements")]
+        for cell in cells:
+            lines.append("{x:>5} {y:>5}  {char!r:4} {calls:>10} {total:>10.4f} {self:>10.4f} {elements:>12}".format(**cell))
+        return "\n".join(lines)
+
+    def write_summary(self, matrix, stream=None):
+        "Print the heatmap and the table of the hottest cells."
+        stream = sys.stderr if stream is None else stream
+        color = stream.isatty()
+        stream.write(self.heatmap(matrix, color) + "\n\n" + self.table(matrix) + "\n")
@@ -0,0 +1,194 @@
+from interpreter import *
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+from collections import deque
+
+# Running many programs on many inputs.
+# A manifest lists jobs, each a program with an input file and optionally a
+# file of its expected output. The jobs are run by a pool of worker
+# processes that import the interpreter once and keep the compiled programs,
+# so a job only costs running its program. A job that runs over the timeout
+# is stopped by replacing its worker with a new one.
+
+max_programs = 2**8
+
+class Job:
+    "A program to run on an input file, whose output may be checked against a file."
+
+    def __init__(self, program, input=None, expected=None):
+        self.program = program
+        self.input = input
+        self.expected = expected
+
+def read_manifest(path):
+    """Read the jobs of a manifest. Each line has the path of a program and
+    optionally the paths of an input file and of the expected output,
+    separated by whitespace and relative to the manifest; blank lines and
+    lines starting with # are skipped."""
+    base = os.path.dirname(path)
+    jobs = []
+    with open(path) as manifest_file:
+        for (n, line) in enumerate(manifest_file, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) > 3:
+                raise Exception("Line {} of the manifest has more than 3 fields.".format(n))
+            jobs.append(Job(*[os.path.join(base, field) for field in fields]))
+    return jobs
+
+def run_job(job, programs):
+    """Run a job in this process, returning a dict of its status, time,
+    output and error. programs is a dict of the Programs by source."""
+    with open(job.program) as source_file:
+        matrix = source_file.read().splitlines()
+    source = "\n".join(matrix)
+    if job.input is None:
+        input_text = ""
+    else:
+        with open(job.input) as input_file:
+            input_text = input_file.read()
+    stdout = sys.stdout
+    captured = io.StringIO()
+    sys.stdout = output.stream = captured
+    output.pieces = []
+    output.size = 0
+    error = None
+    start = time.perf_counter()
+    try:
+        program = programs.get(source)
+        if program is None:
+            program = Program(matrix)
+            if len(programs) >= max_programs:
+                del programs[next(iter(programs))]
+            programs[source] = program
+        program.run(input_text.splitlines())
+        output.flush()
+    except Exception as exception:
+        output.flush()
+        error = "{}: {}".format(type(exception).__name__, exception)
+    finally:
+        elapsed = time.perf_counter() - start
+        sys.stdout = stdout
+        output.stream = None
+    text = captured.getvalue()
+    status = "error" if error is not None else check_output(job, text)
+    return {'status': status, 'time': elapsed, 'output': text, 'error': error}
+
+def check_output(job, text):
+    "ok if the output matches the expected one up to trailing whitespace, or if there's none."
+    if job.expected is None:
+        return "ok"
+    with open(job.expected) as expected_file:
+        expected = expected_file.read()
+    lines = [line.rstrip() for line in text.rstrip().splitlines()]
+    expected_lines = [line.rstrip() for line in expected.rstrip().splitlines()]
+    return "ok" if lines == expected_lines else "wrong"
+
+def worker_main(conn):
+    "Run the jobs received from conn until it sends None."
+    programs = {}
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        try:
+            result = run_job(job, programs)
+        except Exception as exception:
+            # The job's files couldn't be read
+            result = {'status': "error", 'time': 0.0, 'output': "",
+                      'error': "{}: {}".format(type(exception).__name__, exception)}
+        conn.send(result)
+
+class Worker:
+    "A worker process and the job it's running."
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.index = self.deadline = None
+
+    def start(self, index, job, timeout):
+        self.index = index
+        self.deadline = time.monotonic() + timeout
+        self.conn.send(job)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+def run_jobs(jobs, workers=None, timeout=10.0):
+    """Run the jobs with a pool of worker processes, returning a list of the
+    dicts of their results in order. A job that takes over timeout seconds
+    has the status timeout."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # New workers start with the interpreter already imported
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    pending = deque(enumerate(jobs))
+    results = [None] * len(jobs)
+    idle = [Worker(context) for _ in range(workers)]
+    busy = {}
+    try:
+        while pending or busy:
+            while idle and pending:
+                worker = idle.pop()
+                index, job = pending.popleft()
+                worker.start(index, job, timeout)
+                busy[worker.conn] = worker
+            wait_time = max(0.0, min(worker.deadline for worker in busy.values()) - time.monotonic())
+            for conn in multiprocessing.connection.wait(list(busy), wait_time):
+                worker = busy.pop(conn)
+                try:
+                    results[worker.index] = conn.recv()
+                except EOFError:
+                    # The worker died
+                    results[worker.index] = {'status': "error", 'time': 0.0, 'output': "",
+                                             'error': "worker exited with code {}".format(
+                                                 worker.process.exitcode)}
+                    worker.stop()
+                    worker = Worker(context)
+                idle.append(worker)
+            now = time.monotonic()
+            for (conn, worker) in list(busy.items()):
+                if now >= worker.deadline:
+                    del busy[conn]
+                    results[worker.index] = {'status': "timeout", 'time': timeout, 'output': "",
+                                             'error': None}
+                    worker.stop()
+                    idle.append(Worker(context))
+    finally:
+        for worker in idle:
+            worker.conn.send(None)
+            worker.process.join()
+        for worker in busy.values():
+            worker.stop()
+    for (job, result) in zip(jobs, results):
+        result['program'] = job.program
+        result['input'] = job.input
+    return results
+
+def summary(results, wall_time):
+    "A line per job and a line of totals, with the throughput in jobs per second."
+    lines = []
+    for (n, result) in enumerate(results, 1):
+        lines.append("{:>5} {:<8}{:>9.3f} s  {} {}".format(
+            n, result['status'], result['time'], result['program'], result['input'] or ""))
+        if result['error'] is not None:
+            lines.append("      " + result['error'])
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    lines.append("{} jobs ({}) in {:.3f} s, {:.1f} jobs/s".format(
+        len(results), ", ".join("{} {}".format(count, status) for (status, count) in sorted(counts.items())),
+        wall_time, len(results) / wall_time if wall_time > 0 else 0.0))
+    return "\n".join(lines)
@@ -0,0 +1,35 @@
+import io
+
+from batch import read_records, run_batch
+from interpreter import Program, output
+
+def run_captured(matrix, records, delimiter=None):
+    stream = io.StringIO()
+    output.stream = stream
+    try:
+        failures = run_batch(Program(matrix), records, delimiter)
+    finally:
+        output.stream = None
+    return failures, stream.getvalue()
+
+def test_input_items_read_each_record():
+    assert run_captured(["p>i"], [["1"], ["5"]]) == (0, "2\n6\n")
+
+def test_input_functions_read_the_record():
+    assert run_captured(["p>j", "  1"], [["1"], ["2"], ["3"]]) == (0, "2\n3\n4\n")
+
+def test_input_functions_read_after_input_items():
+    records = list(read_records(["1", "2", "--", "3", "4", "--"], "--"))
+    assert run_captured(["p+i", " j", " 1"], records, "--") == (0, "3\n--\n7\n--\n")
+
+def test_raw_input_functions_read_the_record():
+    assert run_captured(["pJ", " 1"], [["abc"], ["de"]]) == (0, "\"abc\"\n\"de\"\n")
+
+def test_reading_past_the_record_fails():
+    failures, text = run_captured(["p>j", "  1"], [[]])
+    assert failures == 1
+
+def test_programs_too_large_to_compile_are_filled(monkeypatch):
+    import compiler
+    monkeypatch.setattr(compiler, 'max_compiled_cells', 0)
+    assert run_captured(["p+i", " j", " 1"], [["1", "2"], ["3", "4"]]) == (0, "3\n7\n")
@@ -0,0 +1,30 @@
+import print_parse
+import struct
+from print_parse import from_python, prettyprint, read_binary, write_binary
+
+def write_header(path, magic, dims, data=b""):
+    with open(path, 'wb') as binary_file:
+        binary_file.write(magic + struct.pack('<I{}Q'.format(len(dims)), len(dims), *dims) + data)
+
+def read_both(monkeypatch, path):
+    "The value read from path with NumPy, if installed, and without it."
+    with_numpy = prettyprint(read_binary(path))
+    monkeypatch.setattr(print_parse, 'numpy', None)
+    without_numpy = prettyprint(read_binary(path))
+    monkeypatch.undo()
+    return with_numpy, without_numpy
+
+def test_empty_dimensions(tmp_path, monkeypatch):
+    for (dims, expected) in [((3, 0), [[], [], []]), ((0, 3), []), ((2, 0, 4), [[], []]),
+                             ((2, 3, 0), [[[], [], []], [[], [], []]]), ((0,), [])]:
+        path = str(tmp_path / "empty")
+        write_header(path, b"JFI8", dims)
+        expected = prettyprint(from_python(expected))
+        assert read_both(monkeypatch, path) == (expected, expected)
+
+def test_round_trip(tmp_path, monkeypatch):
+    path = str(tmp_path / "data")
+    value = [[[1, -2], [3, 4]], [[5, 6], [7, 2**62]]]
+    write_binary(path, from_python(value))
+    expected = prettyprint(from_python(value))
+    assert read_both(monkeypatch, path) == (expected, expected)
@@ -0,0 +1,40 @@
+import pickle
+
+from cache import ProgramCache
+from interpreter import link
+
+matrix = ["p+i", " j", " 1"]
+
+def corrupt_entry(tmp_path, data):
+    cache = ProgramCache(str(tmp_path))
+    cells = cache.link(matrix)
+    path = cache.path(cache.key(matrix))
+    with open(path, 'wb') as cache_file:
+        cache_file.write(data)
+    assert cache.link(matrix) == cells
+    assert cache.misses == 2
+    # The entry was rewritten
+    assert ProgramCache(str(tmp_path)).load(cache.key(matrix)) == cells
+
+def test_hit(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    assert cache.link(matrix) == link(matrix)
+    assert cache.link(matrix) == link(matrix)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_truncated_entry(tmp_path):
+    corrupt_entry(tmp_path, pickle.dumps(link(matrix))[:20])
+
+def test_garbage_entry(tmp_path):
+    corrupt_entry(tmp_path, b"\x80\x05garbage")
+
+def test_entry_of_a_missing_class(tmp_path):
+    # Unpickling raises AttributeError
+    corrupt_entry(tmp_path, b"cutils\nNope\n.")
+
+def test_entry_of_a_missing_module(tmp_path):
+    # Unpickling raises ImportError
+    corrupt_entry(tmp_path, b"cno_such_module\nthing\n.")
+
+def test_entry_of_another_type(tmp_path):
+    corrupt_entry(tmp_path, pickle.dumps({'not': 'cells'}))
@@ -0,0 +1,57 @@
+import itertools
+import math
+
+import pytest
+from vocab import *
+
+C = func_defs['C']
+
+def values(value):
+    return [atom.value for atom in value]
+
+def test_binomial_over_k():
+    for n in [0, 1, 5, 40, 4096, 5000]:
+        assert values(C(from_python(list(range(n + 1))), to_num_atom(n))) == \
+            [math.comb(n, k) for k in range(n + 1)]
+
+def test_binomial_over_n():
+    ns = list(range(2000, 2100)) + [7, 7, 2000, 3]
+    assert [C(to_num_atom(3), to_num_atom(n)).value for n in ns] == [math.comb(n, 3) for n in ns]
+    assert values(C(from_python([2, 5, 9, 3, 2, 10]), to_num_atom(9))) == [36, 126, 1, 84, 36, 0]
+
+def check_unranking(value, expected):
+    assert len(value) == len(expected)
+    assert list(value) == expected
+    assert [value[i] for i in range(len(value))] == expected
+    assert [value[-i] for i in range(1, len(value) + 1)] == expected[::-1]
+    assert value[1::3] == expected[1::3] and value[::-2] == expected[::-2]
+
+def test_unranking_matches_itertools():
+    lists = [from_python(list(range(n))) for n in range(7)]
+    lists += [[to_char_atom(c) for c in "abca"], from_python([[1, 2], [3], [1, 2], []])]
+    for items in lists:
+        for k in range(len(items) + 2):
+            check_unranking(permutations(items, k), [list(p) for p in itertools.permutations(items, k)])
+            check_unranking(combinations(items, k), [list(c) for c in itertools.combinations(items, k)])
+        check_unranking(subsequences(items), [list(s) for k in range(len(items) + 1)
+                                              for s in itertools.combinations(items, k)])
+    items = from_python(list(range(8)))
+    check_unranking(permutations(items), [list(p) for p in itertools.permutations(items)])
+    items = from_python(list(range(16)))
+    check_unranking(combinations(items, 8), [list(c) for c in itertools.combinations(items, 8)])
+
+def test_primitives_match_lists():
+    P = func_defs['!']
+    for n in range(6):
+        items = from_python(list(range(10, 10 + n)))
+        assert P(items) == [list(p) for p in itertools.permutations(items)]
+        assert C(items) == [list(s) for k in range(n + 1) for s in itertools.combinations(items, k)]
+        for k in range(-2, n + 2):
+            if k >= 0:
+                assert P(to_num_atom(k), items) == [list(p) for p in itertools.permutations(items, k)]
+            else:
+                with pytest.raises(ValueError):
+                    P(to_num_atom(k), items)
+            if n:
+                assert C(to_num_atom(k), items) == \
+                    [list(c) for c in itertools.combinations(items, k % n)]
@@ -0,0 +1,70 @@
+import itertools
+
+import kernels
+import vocab
+from vocab import *
+
+fold = lambda c: oper_defs['/'](func_defs[c])
+
+def described(value):
+    "The types and values of the atoms of value, which tell ints from floats."
+    if is_atom(value):
+        return (value.type, type(value.value).__name__, repr(value.value))
+    return [described(item) for item in value]
+
+def outcome(f, *args):
+    try:
+        return described(f(*args))
+    except Exception as error:
+        return type(error).__name__
+
+def both(monkeypatch, f, *args):
+    "The outcome of f with the kernels, and with the atom-by-atom definitions."
+    fast = outcome(f, *args)
+    monkeypatch.setattr(kernels, 'vectorize', False)
+    monkeypatch.setattr(vocab, 'vectorize', False)
+    monkeypatch.setattr(vocab, 'fold_kernels', {})
+    slow = outcome(f, *args)
+    monkeypatch.undo()
+    return fast, slow
+
+def cycled(numbers, size=80):
+    return list(itertools.islice(itertools.cycle(numbers), size))
+
+def rows(numbers, width=10):
+    return [numbers[i:i + width] for i in range(0, len(numbers), width)]
+
+def check_all(monkeypatch, values, unary, binary, folds=""):
+    atoms = [to_num_atom(2), to_num_atom(-1), to_num_atom(0), to_num_atom(0.5)]
+    for x in values:
+        for c in unary:
+            fast, slow = both(monkeypatch, func_defs[c], x)
+            assert fast == slow, c
+        for c in folds:
+            fast, slow = both(monkeypatch, fold(c), x)
+            assert fast == slow, c
+        for (c, y) in itertools.product(binary, values + atoms):
+            for (a, b) in [(x, y), (y, x)]:
+                fast, slow = both(monkeypatch, func_defs[c], a, b)
+                assert fast == slow, c
+
+def test_int64_overflow_is_promoted(monkeypatch):
+    numbers = cycled([2**62, 2**63 - 1, -2**63, -2**62, 3, 2**31, -2**32, 0])
+    values = [from_python(numbers), from_python(rows(numbers)),
+              from_python(cycled([2**63, -2**64, 5, 7]))]
+    assert isinstance(func_defs['+'](values[0], values[1]), NumArray)
+    check_all(monkeypatch, values, "+-*", "+-*x", "+*xmM")
+
+def test_division_and_modulus_by_zero(monkeypatch):
+    values = [from_python(cycled([0, 1, -3, 7, 0, 12, -8, 5])),
+              from_python(cycled([0, 6, -4, 21, 9])),
+              from_python(cycled([0.0, 1.5, -3.0, 7.0, -0.0])),
+              from_python(cycled([2, 4, 8, 16]))]
+    check_all(monkeypatch, values, "%", "%|")
+
+def test_float_folds_and_rounding(monkeypatch):
+    numbers = cycled([1e16, 1.0, -1e16, 0.1, -0.0, 0.0, 2.5, -2.5, 1e300, -1e300, 3.0])
+    values = [from_python(numbers), from_python(rows(numbers)),
+              from_python(rows(cycled([1.0, float('inf'), float('nan'), -0.5])))]
+    assert isinstance(func_defs['*'](values[0], values[0]), NumArray)
+    check_all(monkeypatch, values, "+-*%|mM", "+-*", "+*mM")
@@ -0,0 +1,45 @@
+import io
+
+from memo import *
+from vocab import func_defs
+
+def run_program(program, lines):
+    stream = io.StringIO()
+    output.stream = stream
+    try:
+        program.run(lines)
+        output.flush()
+    finally:
+        output.stream = None
+    return stream.getvalue()
+
+def test_operator_functions_are_reused_between_runs():
+    memo = Memo()
+    program = Program(["p`x+r 5", "   i"], memo=memo)
+    first = run_program(program, ["100"])
+    # The call of p is impure, so it misses every time
+    kept = memo.misses - memo.impure
+    assert run_program(program, ["100"]) == first
+    assert memo.misses - memo.impure == kept and memo.hits > 0
+    run_program(program, ["101"])
+    assert memo.misses - memo.impure > kept
+
+def test_numeric_arrays_are_told_apart():
+    keys = [arg_key(from_ndarray(numpy.array(array)))[0]
+            for array in [[1, 2], [1.0, 2.0], [[1, 2]], [0.0], [-0.0]]]
+    assert len(set(keys)) == len(keys)
+
+def test_large_arguments_are_not_keyed():
+    memo = Memo()
+    f = memo.wrap(func_defs['#'])
+    f(from_python(list(range(max_key_size + 1))))
+    f(from_python(list(range(10))))
+    assert (memo.skipped, memo.misses) == (1, 1)
+
+def test_key_total_is_bounded():
+    memo = Memo(max_key_total=100)
+    f = memo.wrap(func_defs['#'])
+    for n in range(30):
+        f(from_python(list(range(n))))
+    assert memo.key_total == sum(entry[1] for entry in memo.table.values()) <= 100
+    assert len(memo.table) < 30
@@ -0,0 +1,32 @@
+import io
+import pytest
+
+from print_parse import *
+
+def failing_list():
+    "A lazy list whose second item can't be computed."
+    def f(value):
+        raise Exception("no item")
+    trajectory = Trajectory(f, to_num_atom(1), 1)
+    trajectory.append(to_num_atom(2))
+    trajectory.append(to_num_atom(3))
+    return trajectory
+
+@pytest.mark.parametrize('matrix', [False, True])
+def test_failed_value_writes_nothing(matrix):
+    stream = io.StringIO()
+    writer = OutputWriter(stream, buffer_size=1)
+    writer.print_value(from_python([1, 2]), matrix)
+    with pytest.raises(Exception):
+        writer.print_value(from_python([[1], failing_list()]), matrix)
+    writer.print_value(to_num_atom(3), matrix)
+    writer.flush()
+    assert stream.getvalue() == ("1 2\n3\n" if matrix else "[1 2]\n3\n")
+
+def test_values_are_buffered():
+    stream = io.StringIO()
+    writer = OutputWriter(stream)
+    writer.print_value(from_python("abc"))
+    assert stream.getvalue() == ""
+    writer.flush()
+    assert stream.getvalue() == "abc\n"
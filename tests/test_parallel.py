@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import vocab
+from vocab import *
+
+pytestmark = pytest.mark.skipif(not can_fork(), reason="the workers are forked")
+
+@pytest.fixture
+def workers(monkeypatch):
+    "Run every map of at least 16 calls by two workers."
+    monkeypatch.setattr(parallel, 'workers', 2)
+    monkeypatch.setattr(parallel, 'min_time', 0)
+    monkeypatch.setattr(parallel, 'min_call_time', 0)
+    monkeypatch.setattr(parallel, 'transfer_ratio', 0)
+
+def test_results_are_in_order(workers):
+    main = os.getpid()
+    results = map_parallel(lambda n: (n * n, os.getpid()), [(n,) for n in range(200)])
+    assert [square for (square, _) in results] == [n * n for n in range(200)]
+    assert any(pid != main for (_, pid) in results)
+    a = from_python([[n, -n, n % 7] for n in range(300)])
+    b = from_python(list(range(300)))
+    for c in "+*-":
+        result = func_defs[c](a, b)
+        parallel.workers = 1
+        assert result == func_defs[c](a, b)
+        parallel.workers = 2
+
+def test_impure_calls_are_made_once(workers, monkeypatch, tmp_path):
+    path = tmp_path / "out.txt"
+    # Line buffered, so that anything printed in a worker would reach the file
+    with open(path, 'w', buffering=1) as stream:
+        monkeypatch.setattr(vocab, 'output', OutputWriter(stream, buffer_size=1))
+        values = from_python([[n, n + 1] for n in range(40)])
+        assert oper_defs['L'](to_num_atom(0), func_defs['p'])(values) == from_python([m for n in range(40) for m in (n, n + 1)])
+    assert path.read_text() == "".join("{}\n{}\n".format(n, n + 1) for n in range(40))
+
+def test_errors_are_reraised(workers):
+    def f(n):
+        if n == 150:
+            raise ValueError("bad item {}".format(n))
+        return n
+    with pytest.raises(ValueError, match="bad item 150"):
+        map_parallel(f, [(n,) for n in range(200)])
@@ -0,0 +1,136 @@
+import io
+
+import pytest
+
+from print_parse import *
+
+def old_parse_value(string):
+    "parse_value as it was before it kept a cursor, without the streaming."
+    digits = "0123456789"
+    string = string.lstrip()
+    if string[0] in '-.e' + digits:
+        neg = string[0] == '-'
+        j = j0 = 1 if neg else 0
+        while j < len(string) and string[j] in digits:
+            j += 1
+        if j < len(string) and string[j] == '.':
+            dec = True
+            j += 1
+            while j < len(string) and string[j] in digits:
+                j += 1
+        else:
+            dec = False
+        j1 = j
+        if j < len(string) and string[j] == 'e':
+            exp = True
+            j += 1
+            neg_exp = j < len(string) and string[j] == '-'
+            j = j2 = j+1 if neg_exp else j
+            while j < len(string) and string[j] in digits:
+                j += 1
+            if j < len(string) and string[j] == '.':
+                dec_exp = True
+                j += 1
+                while j < len(string) and string[j] in digits:
+                    j += 1
+            else:
+                dec_exp = False
+        else:
+            exp = False
+        multiplier = (-1 if neg else 1) * (float if dec else int)(string[j0:j1])
+        if exp:
+            exponent = (-1 if neg_exp else 1) * (float if dec_exp else int)(string[j2:j])
+        else:
+            exponent = 0
+        return to_num_atom(multiplier * 10**exponent), string[j:]
+    elif string[0] == "'":
+        if string[1] == '\\' and string[3] == "'":
+            char = string[2]
+            j = 4
+        elif string[2] == "'":
+            char = string[1]
+            j = 3
+        return to_char_atom(char), string[j:]
+    elif string[0] == '"':
+        parsed_string = ""
+        j = 1
+        while string[j] != '"':
+            if string[j] == '\\':
+                char = string[j+1]
+                if char == 'n':
+                    char = '\n'
+                parsed_string += char
+                j += 2
+            else:
+                parsed_string += string[j]
+                j += 1
+        return [to_char_atom(char) for char in parsed_string], string[j+1:]
+    elif string[0] == '[':
+        array = []
+        string = string[1:].lstrip()
+        while string[0] != ']':
+            value, string = old_parse_value(string)
+            array.append(value)
+            string = string.lstrip()
+        return array, string[1:]
+
+def described(value):
+    "The types and values of the atoms of value."
+    if is_atom(value):
+        return (value.type, type(value.value).__name__, value.value)
+    return [described(item) for item in value]
+
+inputs = ["0", "-12", "  -0.5 rest", "1e3", "-2.5e-2", "12.e2", "[-1 -2 -3]", "[]", "[[]]",
+          "[[1 2] [3 [4 -5]] [] [[[-6]]]]", "'a'", "'\\''", "'\\n'", "['a' 'b' ' ']",
+          '"ab\\"c"', '"a\\nb\\\\"', '["x" "" "yz"]', "[1 'a' \"bc\" [2.5 -3e2]] [4]",
+          "[\n 1  2\n\t[3]\n]\n", "[1 -2 3.5 -4 [5 -6] 7]"]
+
+def test_values_match_the_old_parser():
+    for string in inputs:
+        value, rest = parse_value(string)
+        old_value, old_rest = old_parse_value(string)
+        assert (described(value), rest) == (described(old_value), old_rest), string
+
+def test_round_trips():
+    for string in inputs:
+        value = parse_value(string)[0]
+        printed = prettyprint(value)
+        if is_atom(value) and value.type == AtomType.char or '"' in printed[1:-1] or '\\' in printed:
+            # A character prints without quotes, and strings print without escapes
+            continue
+        assert described(parse_value(prettyprint(value))[0]) == described(value), string
+
+def test_streamed_in_small_chunks(monkeypatch):
+    values = [string for string in inputs if "rest" not in string]
+    text = " ".join(values[:-2] + ["\n"] + values[-2:])
+    expected = []
+    rest = text
+    while rest.strip():
+        value, rest = old_parse_value(rest)
+        expected.append(described(value))
+    for chunk_size in [1, 2, 3, 7, 2**16]:
+        monkeypatch.setattr(ValueParser, 'chunk_size', chunk_size)
+        assert [described(value) for value in read_values(io.StringIO(text))] == expected
+
+def test_error_positions():
+    for (string, line, column) in [("[1 2\n 3 x]", 2, 4), ("[1 2", 1, 5), ("\n\n  [1 ?]", 3, 6)]:
+        with pytest.raises(Exception, match="line {}, column {}:".format(line, column)):
+            parse_value(string)
+
+def test_streaming_keeps_the_buffer_bounded(monkeypatch):
+    monkeypatch.setattr(ValueParser, 'chunk_size', 2**10)
+    texts = [" ".join("[" + " ".join("{}.{}".format(n, n % 7) for n in range(k, k + 40)) + "]"
+                      for k in range(0, 20000, 40)),
+             " ".join("[" + " ".join(str(-n * 37) for n in range(k, k + 40)) + "]"
+                      for k in range(0, 20000, 40)),
+             " ".join(["'a'", "'\\n'", "'\\''", "' '", '"b\\"c"', "-12e-1"][n % 6] for n in range(30000))]
+    for text in texts:
+        parser = ValueParser(io.StringIO(text))
+        values = []
+        longest = 0
+        while parser.peek():
+            values.append(described(parser.parse()))
+            longest = max(longest, len(parser.buffer))
+        assert longest <= 4 * ValueParser.chunk_size
+        assert values == [described(value) for value in read_values(io.StringIO(text))]
+        assert values == [described(value) for value in parse_value("[" + text + "]")[0]]
@@ -0,0 +1,49 @@
+import random
+
+import primes
+from primes import is_prime, max_sieve_size, prime_factors
+from vocab import *
+
+def trial_division(n):
+    "The prime factors of n > 0, found as x found them before, but stopping at the square root."
+    factors = []
+    div = 2
+    while div * div <= n:
+        if n % div == 0:
+            n //= div
+            factors.append(div)
+        else:
+            div += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+def test_factors_match_trial_division():
+    rng = random.Random(0)
+    small = [p for p in range(2, 10**5) if is_prime(p)]
+    numbers = list(range(1, 3000)) + list(range(max_sieve_size - 50, max_sieve_size + 50))
+    numbers += [561, 41041, 825265, 321197185, 3215031751]
+    for _ in range(40):
+        p, q = rng.choice(small), rng.choice(small)
+        numbers += [p * q, p * p, p**3, 12 * p * q]
+    for n in numbers:
+        assert prime_factors(n) == trial_division(n), n
+
+def test_primes_past_the_sieve():
+    for n in range(max_sieve_size, max_sieve_size + 3000):
+        assert is_prime(n) == (trial_division(n) == [n]), n
+
+def test_large_factors():
+    # Both are primes, the first one above the bound of deterministic Miller-Rabin
+    large, medium = 2**89 - 1, 1000003
+    assert is_prime(large) and is_prime(medium)
+    assert prime_factors(2 * 3**4 * medium * large) == [2, 3, 3, 3, 3, medium, large]
+    assert prime_factors(medium**2 * 1000033) == [medium, medium, 1000033]
+    assert not is_prime(large * medium)
+    assert len(primes.factorizations) <= primes.max_factorizations
+
+def test_factorize():
+    x = func_defs['x']
+    for n in [0, 1, -1, -12, 97, -2**10 * 3]:
+        expected = [0] if n == 0 else [-1] * (n < 0) + trial_division(abs(n))
+        assert [atom.value for atom in x(to_num_atom(n))] == expected
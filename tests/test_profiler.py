@@ -0,0 +1,25 @@
+from profiler import *
+
+def test_elements_without_forcing():
+    def f(value):
+        raise Exception("forced")
+    profiler = Profiler()
+    trajectory = Trajectory(f, to_num_atom(0), 4)
+    for _ in range(9):
+        trajectory.append(to_num_atom(0))
+    values = {'atom': to_num_atom(1), 'trajectory': trajectory,
+              'nested': from_python([[1, 2], [3, [4, 5]]]), 'none': None,
+              'range': func_defs['r'](from_python([10**9, 3])),
+              'array': func_defs['*'](to_num_atom(2), from_python([[1, 2, 3]] * 40))}
+    for name in values:
+        profiler.wrap((0, 0), lambda a=None, b=None, name=name: values[name])()
+    assert isinstance(values['array'], NumArray)
+    assert profiler.cells[(0, 0)].elements == 1 + 10 + 5 + 0 + 3 * 10**9 * 2 + 120
+    assert profiler.cells[(0, 0)].calls == 6
+
+def test_program_profile():
+    profiler = Profiler()
+    interpret(["p*r", "  3"], profiler=profiler)
+    output.flush()
+    report = profiler.report(["p*r", "  3"])
+    assert {cell['char']: cell['elements'] for cell in report['cells']} == {'p': 3, '*': 3, 'r': 3}
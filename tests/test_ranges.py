@@ -0,0 +1,89 @@
+import itertools
+import sys
+import tracemalloc
+
+from print_parse import prettyprint
+from vocab import *
+
+r = func_defs['r']
+fold = lambda c: oper_defs['/'](func_defs[c])
+
+def as_list(value):
+    "The same value in an ordinary list of atoms."
+    if is_atom(value):
+        return value
+    return [make_atom(item.type, item.value) for item in value]
+
+def test_affine_maps_stay_lazy():
+    big = r(to_num_atom(10**8))
+    for (c, args, first, last) in [('+', (big, to_num_atom(3)), 3, 10**8 + 2),
+                                   ('-', (to_num_atom(1), big), -1, 10**8 - 2),
+                                   ('-', (big, to_num_atom(1)), 1, 2 - 10**8),
+                                   ('*', (to_num_atom(-2), big), 0, 2 - 2*10**8),
+                                   ('+', (big, big), 0, 2*10**8 - 2)]:
+        value = func_defs[c](*args)
+        assert isinstance(value, Range)
+        assert (value[0].value, value[-1].value, len(value)) == (first, last, 10**8)
+    assert isinstance(func_defs['-'](big), Range)
+
+def test_affine_maps_match_lists():
+    ranges = [r(to_num_atom(70)), r(to_num_atom(5), to_num_atom(-90)), r(to_num_atom(2**70))[:80]]
+    others = [to_num_atom(3), to_num_atom(0), to_num_atom(-2**62), to_num_atom(2.5), to_char_atom('a')]
+    for (x, y) in itertools.product(ranges, ranges + others):
+        for c in '+-*':
+            for (a, b) in [(x, y), (y, x)]:
+                expected = func_defs[c](as_list(a), b if is_atom(b) else as_list(b))
+                assert prettyprint(func_defs[c](a, b)) == prettyprint(expected)
+        for c in '+-':
+            assert prettyprint(func_defs[c](x)) == prettyprint(func_defs[c](as_list(x)))
+
+def test_folds_of_ranges():
+    big = r(to_num_atom(10**8))
+    assert fold('+')(big).value == 10**8 * (10**8 - 1) // 2
+    assert fold('*')(big).value == 0
+    assert fold('m')(func_defs['-'](big)).value == 1 - 10**8
+    assert fold('M')(func_defs['-'](big)).value == 0
+    for x in [r(to_num_atom(50)), r(to_num_atom(7), to_num_atom(-30)), r(to_char_atom('a'), to_char_atom('k'))]:
+        for c in '+*xmM':
+            result, expected = fold(c)(x), fold(c)(as_list(x))
+            assert (result.type, result.value) == (expected.type, expected.value)
+
+def test_filtering_ranges():
+    x = r(to_num_atom(-50), to_num_atom(150))
+    for mask in [func_defs['|'](to_num_atom(3), r(to_num_atom(200))),
+                 func_defs['|'](to_num_atom(2), r(to_num_atom(120))),
+                 func_defs['-'](to_num_atom(1), func_defs['|'](to_num_atom(2), r(to_num_atom(64)))),
+                 to_num_atom(2)]:
+        assert prettyprint(func_defs['#'](mask, x)) == prettyprint(func_defs['#'](as_list(mask), as_list(x)))
+
+def test_huge_range_products_iterate():
+    factors = [r(to_num_atom(2**16)) for _ in range(4)]
+    product = range_product(factors)
+    assert product.length > sys.maxsize
+    first = list(itertools.islice(product, 3))
+    assert [[atom.value for atom in word] for word in first] == [[0, 0, 0, 0], [0, 0, 0, 1], [0, 0, 0, 2]]
+    tracemalloc.start()
+    try:
+        for value in [r([to_num_atom(10**8)]), r([to_num_atom(10**7), to_num_atom(2)])]:
+            assert isinstance(value, RangeProduct)
+            assert len(list(itertools.islice(value, 1000))) == 1000
+        assert tracemalloc.get_traced_memory()[1] < 2**20
+    finally:
+        tracemalloc.stop()
+
+def test_range_products_match_lists():
+    for ends in [[3], [-2], [2, 3], [3, -2, 2], [1, 1, 4]]:
+        value = r(from_python(ends))
+        expected = [list(word) for word in itertools.product(*[as_list(r(to_num_atom(end))) for end in ends])]
+        assert list(value) == expected and value[:] == expected
+
+def test_folds_of_filtered_ranges():
+    x = r(to_num_atom(-300), to_num_atom(300))
+    for mask in [func_defs['|'](to_num_atom(3), x), func_defs['|'](to_num_atom(2), x)]:
+        kept = func_defs['#'](mask, x)
+        assert isinstance(kept, NumArray)
+        for y in [kept, func_defs['*'](to_num_atom(2**60), kept), func_defs['-'](to_num_atom(7), kept)]:
+            for c in '+*x':
+                result, expected = fold(c)(y), fold(c)(as_list(y))
+                assert (result.type, type(result.value), result.value) == \
+                    (expected.type, type(expected.value), expected.value)
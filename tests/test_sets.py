@@ -0,0 +1,32 @@
+import io
+
+import utils
+from interpreter import *
+
+def test_key_sets_are_dropped_after_a_run(monkeypatch):
+    searched = []
+    key_set = utils.key_set
+    def recorded_key_set(array):
+        searched.append(len(array))
+        return key_set(array)
+    monkeypatch.setattr(utils, 'key_set', recorded_key_set)
+    output.stream = stream = io.StringIO()
+    try:
+        program = Program(["Pc,r 100", " 5"])
+        for _ in range(2):
+            program.run([])
+            assert not utils.key_sets
+        interpret(["Pc,r 100", " 500"])
+        assert not utils.key_sets
+        output.flush()
+    finally:
+        output.stream = None
+    assert stream.getvalue() == "1\n1\n0\n"
+    assert searched == [100, 100, 100]
+
+def test_membership_of_large_lists():
+    c, u = func_defs['c'], func_defs['u']
+    items = from_python([[n % 7, n % 5] for n in range(200)] + [3, 2.5])
+    for x in from_python([[1, 1], [6, 4], [7, 0], 3, 3.0, 2.5, 4]):
+        assert c(x, items).value == int(x in list(items))
+    assert len(u(items)) == 37
@@ -1,11 +1,23 @@
 from itertools import cycle
 from enum import Enum
+from parallel import *
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class AtomType(Enum):
     num = 0
     char = 1
 
 class Atom:
+    """An atomic value. Atoms are never modified after creation, so they
+    can be shared; use make_atom to get interned small ints and chars."""
+
+    __slots__ = ('type', 'value')
+
     def __init__(self, type, value):
         self.type = type
         self.value = value
@@ -49,17 +61,324 @@ class Atom:
         else:
             return False
 
+    def __hash__(self):
+        # Consistent with __eq__, which compares only the values
+        return hash(self.value)
+
+    def __reduce__(self):
+        # Unpickled atoms, like the results of worker processes, are interned
+        return (make_atom, (self.type, self.value))
+
     def __repr__(self):
         if self.type == AtomType.num:
             return "<{}>".format(self.value)
         else:
             return "<{}>".format(repr(chr(abs(int(self.value)))))
 
+min_interned_int = -256
+max_interned_int = 1024
+max_interned_char = 0x10000
+interned_nums = [Atom(AtomType.num, n)
+                 for n in range(min_interned_int, max_interned_int)]
+interned_chars = {}
+
+def make_atom(type, value):
+    "Create an atom, reusing interned ones for small ints and BMP characters."
+    if value.__class__ is int:
+        if type is AtomType.num:
+            if min_interned_int <= value < max_interned_int:
+                return interned_nums[value - min_interned_int]
+        elif 0 <= value < max_interned_char:
+            atom = interned_chars.get(value)
+            if atom is None:
+                atom = interned_chars[value] = Atom(type, value)
+            return atom
+    return Atom(type, value)
+
 def to_num_atom(d):
-    return Atom(AtomType.num, d)
+    return make_atom(AtomType.num, d)
 
 def to_char_atom(c):
-    return Atom(AtomType.char, abs(int(ord(c))))
+    return make_atom(AtomType.char, ord(c))
+
+class VirtualList:
+    """A list-like value whose items are not stored in a Python list.
+    Subclasses implement __len__, item and optionally slice."""
+
+    __slots__ = ()
+    __hash__ = None
+
+    def item(self, index):
+        raise NotImplementedError
+
+    def known_shape(self):
+        "The shape of the value if it's known without iterating over it, or None."
+        return None
+
+    def known_height(self):
+        "The height of the value if it's known without iterating over it, or None."
+        known_shape = self.known_shape()
+        return None if known_shape is None else len(known_shape)
+
+    def slice(self, indices):
+        return [self.item(i) for i in range(*indices.indices(len(self)))]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.slice(index)
+        index = operator.index(index)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        return self.item(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.item(i)
+
+    def __reversed__(self):
+        for i in reversed(range(len(self))):
+            yield self.item(i)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __contains__(self, value):
+        return any(item is value or item == value for item in self)
+
+    def __add__(self, other):
+        if isinstance(other, (list, VirtualList)):
+            return list(self) + list(other)
+        return NotImplemented
+
+    def __radd__(self, other):
+        if isinstance(other, (list, VirtualList)):
+            return list(other) + list(self)
+        return NotImplemented
+
+    def __mul__(self, times):
+        return list(self) * times
+
+    __rmul__ = __mul__
+
+    def compare(self, other, op):
+        "Compare with another value like Python lists do; atoms are lower than lists."
+        if isinstance(other, Atom):
+            return op(1, 0)
+        if not isinstance(other, (list, VirtualList)):
+            return NotImplemented
+        if op in (operator.eq, operator.ne) and len(self) != len(other):
+            return op(0, 1)
+        for x, y in zip(self, other):
+            if not (x is y or x == y):
+                return op(x, y)
+        return op(len(self), len(other))
+
+    def __eq__(self, other):
+        return self.compare(other, operator.eq)
+
+    def __ne__(self, other):
+        return self.compare(other, operator.ne)
+
+    def __lt__(self, other):
+        return self.compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self.compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self.compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self.compare(other, operator.ge)
+
+    def __repr__(self):
+        return repr(list(self))
+
+def from_python(value):
+    "Convert nested Python lists of numbers into a value."
+    if isinstance(value, list):
+        return [from_python(item) for item in value]
+    return to_num_atom(value)
+
+def from_numpy_scalar(x):
+    return x.item() if isinstance(x, numpy.generic) else x
+
+class NumArray(VirtualList):
+    """A nonempty rectangular array of numbers backed by a NumPy ndarray.
+    The dtype is int64, float64, or object for ints that overflow int64."""
+
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def known_shape(self):
+        return list(self.array.shape)
+
+    def item(self, index):
+        if self.array.ndim == 1:
+            return to_num_atom(from_numpy_scalar(self.array[index]))
+        return NumArray(self.array[index])
+
+    def slice(self, indices):
+        return from_ndarray(self.array[indices])
+
+    def __iter__(self):
+        if self.array.ndim == 1:
+            return map(to_num_atom, self.array.tolist())
+        return (NumArray(row) for row in self.array)
+
+    def __add__(self, other):
+        if (isinstance(other, NumArray) and
+            self.array.shape[1:] == other.array.shape[1:] and
+            (self.array.dtype == other.array.dtype)):
+            return NumArray(numpy.concatenate([self.array, other.array]))
+        return VirtualList.__add__(self, other)
+
+    def compare(self, other, op):
+        if isinstance(other, NumArray) and op in (operator.eq, operator.ne):
+            if self.array.shape != other.array.shape:
+                return op(0, 1)
+            return op(bool((self.array == other.array).all()), True)
+        return VirtualList.compare(self, other, op)
+
+    def __contains__(self, value):
+        if isinstance(value, Atom):
+            if self.array.ndim > 1:
+                return False
+            return bool((self.array == value.value).any())
+        return VirtualList.__contains__(self, value)
+
+    def to_list(self):
+        return from_python(self.array.tolist())
+
+def from_ndarray(array):
+    "Convert an ndarray into a value, keeping it array-backed when possible."
+    if array.ndim == 0:
+        return to_num_atom(from_numpy_scalar(array[()]))
+    if array.size == 0:
+        return from_python(array.tolist())
+    return NumArray(array)
+
+class Range(VirtualList):
+    """A nonempty arithmetic progression of atoms of the same type,
+    backed by a Python range."""
+
+    __slots__ = ('type', 'range')
+
+    def __init__(self, type, range):
+        self.type = type
+        self.range = range
+
+    def __len__(self):
+        return len(self.range)
+
+    def known_shape(self):
+        return [len(self.range)]
+
+    def item(self, index):
+        return make_atom(self.type, self.range[index])
+
+    def slice(self, indices):
+        return from_range(self.type, self.range[indices])
+
+    def __iter__(self):
+        type = self.type
+        return (make_atom(type, n) for n in self.range)
+
+    def __reversed__(self):
+        type = self.type
+        return (make_atom(type, n) for n in reversed(self.range))
+
+    def __contains__(self, value):
+        if not isinstance(value, Atom):
+            return False
+        number = value.value
+        if isinstance(number, float):
+            if not number.is_integer():
+                return False
+            number = int(number)
+        return number in self.range
+
+    def compare(self, other, op):
+        if isinstance(other, Range) and op in (operator.eq, operator.ne):
+            return op(self.range, other.range)
+        return VirtualList.compare(self, other, op)
+
+def from_range(type, range):
+    "A value holding the atoms of the given type with the numbers in a range."
+    return Range(type, range) if range else []
+
+class RangeProduct(VirtualList):
+    """The cartesian product of several ranges in lexicographic order,
+    where each item is a list with one atom from each range."""
+
+    __slots__ = ('factors', 'length')
+
+    def __init__(self, factors):
+        self.factors = factors
+        self.length = 1
+        for factor in factors:
+            self.length *= len(factor)
+
+    def __len__(self):
+        return self.length
+
+    def known_shape(self):
+        return [self.length, len(self.factors)]
+
+    def item(self, index):
+        word = []
+        for factor in reversed(self.factors):
+            index, digit = divmod(index, len(factor))
+            word.append(factor[digit])
+        word.reverse()
+        return word
+
+    def __iter__(self):
+        # Count with an odometer over the indices into the factors, since the
+        # length may be too large for a Python range and itertools.product
+        # would build the list of the items of each factor; the last factor,
+        # which changes on every item, is iterated over directly, and only
+        # kept as a list if it is short
+        factors = self.factors
+        last = len(factors) - 1
+        lengths = [len(factor) for factor in factors]
+        indices = [0] * last
+        word = [factor[0] for factor in factors]
+        inner = factors[last]
+        if lengths[last] <= 4096:
+            inner = list(inner)
+        while True:
+            for atom in inner:
+                word[last] = atom
+                yield list(word)
+            position = last - 1
+            while position >= 0:
+                index = indices[position] + 1
+                if index < lengths[position]:
+                    indices[position] = index
+                    word[position] = factors[position][index]
+                    break
+                indices[position] = 0
+                word[position] = factors[position][0]
+                position -= 1
+            else:
+                return
+
+def range_product(factors):
+    "The cartesian product of a list of ranges as a value."
+    if not factors:
+        return [[]]
+    if any(not factor for factor in factors):
+        return []
+    return RangeProduct(factors)
 
 def is_value(item):
     return not callable(item)
@@ -79,13 +398,163 @@ def full_copy(value):
     else:
         return [full_copy(item) for item in value]
 
+def owned_copy(value, owned):
+    "A list with the items of value that's in owned, a dict of lists by id, copying it if needed."
+    if id(value) in owned:
+        return value
+    copy = list(value)
+    owned[id(copy)] = copy
+    return copy
+
+def replace_at(value, index, item, owned):
+    """Replace an item of the list value, following the coordinates of index
+    into nested lists until the last one or an atom, and return the new value.
+    Only the lists on the path are copied, unless they're in owned, to which
+    the copies are added; the other lists are shared with value."""
+    value = focus = owned_copy(value, owned)
+    if not index:
+        i = 0 % len(focus)
+    for (n, coord) in enumerate(index):
+        i = int(coord) % len(focus)
+        child = focus[i]
+        if is_atom(child) or n == len(index) - 1:
+            break
+        child = owned_copy(child, owned)
+        focus[i] = child
+        focus = child
+    focus[i] = item
+    return value
+
+def value_key(value):
+    """A hashable key for a value, such that two values are equal if and only
+    if their keys are equal. Atoms are keyed by their value, so numbers and
+    characters with the same value have the same key, and lists by tuples.
+    Returns None if the value contains NaN, which isn't equal to itself."""
+    if is_atom(value):
+        key = value.value
+        return None if key != key else key
+    if isinstance(value, NumArray):
+        if value.array.dtype == numpy.float64 and numpy.isnan(value.array).any():
+            return None
+        return nested_tuple(value.array.tolist())
+    keys = tuple(map(value_key, value))
+    return None if None in keys else keys
+
+def nested_tuple(value):
+    if isinstance(value, list):
+        return tuple(map(nested_tuple, value))
+    return value
+
+def value_keys(array):
+    "The keys of the items of a list, or None if some item has no key."
+    keys = [value_key(item) for item in array]
+    return None if None in keys else keys
+
 def uniques(array):
+    keys = value_keys(array)
+    if keys is None:
+        out = []
+        for item in array:
+            if item not in out:
+                out.append(item)
+        return out
+    seen = set()
     out = []
-    for item in array:
-        if item not in out:
+    for (key, item) in zip(keys, array):
+        if key not in seen:
+            seen.add(key)
             out.append(item)
     return out
 
+def sort_key(value):
+    """A flat tuple that orders like the value: atoms by their value and
+    below lists, and lists lexicographically. An atom is encoded as 1 and
+    its value, and a list as 2, its items and 0, which is below any item.
+    Returns None if the value contains NaN, which isn't ordered."""
+    key = []
+    add_sort_key(value, key)
+    return None if any(x != x for x in key) else tuple(key)
+
+def add_sort_key(value, key):
+    if is_atom(value):
+        key += (1, value.value)
+        return
+    key.append(2)
+    for item in value:
+        if is_atom(item):
+            key += (1, item.value)
+        else:
+            add_sort_key(item, key)
+    key.append(0)
+
+def sort_keys(array):
+    """Keys that sort the items of a list like the items themselves, or None
+    if some item contains NaN. Lists of atoms and lists of lists of atoms
+    are keyed by values and tuples of values; other lists use sort_key."""
+    if all(map(is_atom, array)):
+        keys = [item.value for item in array]
+        values = keys
+    elif not any(map(is_atom, array)) and all(is_atom(x) for item in array for x in item):
+        keys = [tuple([x.value for x in item]) for item in array]
+        values = [x for key in keys for x in key]
+    else:
+        keys = [sort_key(item) for item in array]
+        return None if None in keys else keys
+    return None if any(x != x for x in values) else keys
+
+def sort(array):
+    "The items of a list in increasing order; the sort is stable."
+    array = list(array)
+    keys = sort_keys(array)
+    if keys is None:
+        return list(sorted(array))
+    order = sorted(range(len(array)), key=keys.__getitem__)
+    return [array[i] for i in order]
+
+def sort_by(keys, array):
+    "The items of a list ordered by the corresponding keys, then by themselves."
+    array = list(array)
+    key_keys, item_keys = sort_keys(keys), sort_keys(array)
+    if key_keys is None or item_keys is None:
+        return [x for (y, x) in sorted(zip(keys, array))]
+    pairs = list(zip(key_keys, item_keys))
+    order = sorted(range(len(array)), key=pairs.__getitem__)
+    return [array[i] for i in order]
+
+# Sets of keys of recently searched lists, by their id.
+# They are dropped after each run of a program, so that the lists don't
+# outlive it.
+key_sets = {}
+max_key_sets = 16
+min_key_set_size = 64
+
+def key_set(array):
+    "The set of keys of the items of a list, cached for repeated searches."
+    cached = key_sets.get(id(array))
+    if cached is not None and cached[1] is array:
+        return cached[0]
+    keys = value_keys(array)
+    keys = None if keys is None else set(keys)
+    if len(key_sets) >= max_key_sets:
+        del key_sets[next(iter(key_sets))]
+    # Keep the list alive so that its id is not reused
+    key_sets[id(array)] = (keys, array)
+    return keys
+
+def clear_key_sets():
+    "Drop the cached sets of keys, and the lists they keep alive."
+    key_sets.clear()
+
+def contains(array, value):
+    "Whether a value is an item of a list; large lists are searched with a set of keys."
+    if isinstance(array, VirtualList) or len(array) < min_key_set_size:
+        return value in array
+    keys = key_set(array)
+    key = value_key(value)
+    if keys is None or key is None:
+        return value in array
+    return key in keys
+
 def prefixes(a):
     if is_atom(a):
         a = un_range(a)
@@ -105,14 +574,22 @@ def infixes(a, n):
 def shape(value):
     if is_atom(value):
         return []
+    elif isinstance(value, VirtualList) and value.known_shape() is not None:
+        return value.known_shape()
     else:
         shapes = zip(*[shape(item) for item in value])
         return [len(value)] + [min(x) for x in shapes]
 
-def flatten(value, max_height=0):
-    if height(value) <= max_height:
+def flatten(value, max_height=0, heights=None):
+    if heights is None:
+        heights = {}
+    value_height = height(value, heights)
+    if value_height <= max_height:
         return [value]
-    return [subitem for item in value for subitem in flatten(item, max_height)]
+    if isinstance(value, NumArray) and max_height >= 0:
+        array = value.array
+        return NumArray(array.reshape((-1,) + array.shape[value_height-max_height:]))
+    return [subitem for item in value for subitem in flatten(item, max_height, heights)]
 
 def join_times(value, times=1):
     if is_atom(value) or times == 0:
@@ -155,49 +632,91 @@ def grid(iterator, shape):
     return next(iterator)
 
 def reshape(value, shape):
+    if isinstance(value, NumArray):
+        dims = [int(dim) for dim in shape]
+        if all(dim > 0 for dim in dims):
+            return from_ndarray(numpy.resize(value.array, dims))
     iterator = cycle(flatten(value))
     return grid(iterator, shape)
 
 def rank(value):
     return len(shape(value))
 
-def height(value):
+def height(value, heights=None):
+    """Compute the height of a value.
+    If heights is a dict, it caches the heights of lists by their id;
+    it must not be reused after any of them has been modified."""
     if is_atom(value):
         return 0
+    if isinstance(value, VirtualList):
+        known_height = value.known_height()
+        if known_height is not None:
+            return known_height
+    if heights is None:
+        if value:
+            return 1 + max(height(item) for item in value)
+        return 1
+    cached = heights.get(id(value))
+    if cached is not None:
+        return cached[0]
     if value:
-        return 1 + max(height(item) for item in value)
-    return 1
+        value_height = 1 + max(height(item, heights) for item in value)
+    else:
+        value_height = 1
+    # Keep the value alive so that its id is not reused
+    heights[id(value)] = (value_height, value)
+    return value_height
 
 def incneg(n):
     return n + (n<0)
 
 def thread_binary(f, height1, height2):
-    def threaded_f(a, b, lev1=height1, lev2=height2):
-        height_a, height_b = height(a), height(b)
-        if height_a <= max(0, lev1) or lev1 == -1:
-            if height_b <= max(0, lev2) or lev2 == -1:
+    def threaded_f(a, b, lev1, lev2, heights):
+        if lev1 == -1 or height(a, heights) <= max(0, lev1):
+            if lev2 == -1 or height(b, heights) <= max(0, lev2):
                 return f(a, b)
             else:
-                return [threaded_f(a, y, -1, incneg(lev2))
+                return [threaded_f(a, y, -1, incneg(lev2), heights)
                         for y in b]
-        elif height_b <= max(0, lev2) or lev2 == -1:
-            return [threaded_f(x, b, incneg(lev1), -1)
+        elif lev2 == -1 or height(b, heights) <= max(0, lev2):
+            return [threaded_f(x, b, incneg(lev1), -1, heights)
                     for x in a]
         else:
-            return [threaded_f(x, y, incneg(lev1), incneg(lev2))
+            return [threaded_f(x, y, incneg(lev1), incneg(lev2), heights)
                     for (x, y) in zip(a,b)]
-    return threaded_f
+    def outer_f(a, b):
+        heights = {}
+        if parallel.workers > 1:
+            args = outer_args(a, b, height1, height2, heights)
+            if args is not None:
+                return map_parallel(threaded_f, args)
+        return threaded_f(a, b, height1, height2, heights)
+    return outer_f
+
+def outer_args(a, b, lev1, lev2, heights):
+    """The arguments of the calls of threaded_f that thread_binary makes
+    for a and b, or None if it calls f on them directly."""
+    if lev1 == -1 or height(a, heights) <= max(0, lev1):
+        if lev2 == -1 or height(b, heights) <= max(0, lev2):
+            return None
+        return [(a, y, -1, incneg(lev2), heights) for y in b]
+    elif lev2 == -1 or height(b, heights) <= max(0, lev2):
+        return [(x, b, incneg(lev1), -1, heights) for x in a]
+    return [(x, y, incneg(lev1), incneg(lev2), heights) for (x, y) in zip(a, b)]
 
 def thread_unary(f, height):
-    return lambda a: thread_binary(lambda x, y: f(x), height, -1)(a, None)
+    threaded_f = thread_binary(lambda x, y: f(x), height, -1)
+    return lambda a: threaded_f(a, None)
 
 def un_range(x):
     if is_atom(x):
         end = int(x.value)
         if end >= 0:
-            return [Atom(x.type, n) for n in range(end)]
+            return from_range(x.type, range(end))
         else:
-            return [Atom(x.type, -n) for n in reversed(range(-end))]
+            return from_range(x.type, range(end+1, 1))
+    elif x and all(is_atom(item) for item in x):
+        return range_product([un_range(item) for item in x])
     elif x:
         return [[n] + w
                 for n in un_range(x[0])
@@ -211,27 +730,101 @@ def bin_range(x):
     elif height(x) == 1:
         (lo_type, lo), (hi_type, hi) = map(lambda y: (y.type, int(y.value)), x)
         if lo <= hi:
-            return [Atom(lo_type, y) for y in range(lo, hi)]
+            return from_range(lo_type, range(lo, hi))
         else:
-            return [Atom(lo_type, y) for y in reversed(range(hi, lo))]
+            return from_range(lo_type, range(lo-1, hi-1, -1))
+    elif all(not is_atom(pair) and height(pair) == 1 for pair in x):
+        return range_product([bin_range(pair) for pair in x])
     else:
         return [[y] + w
                 for y in bin_range(x[0])
                 for w in bin_range(x[1:])]
 
+class IterationOptions:
+    """Options of the iteration functions. With detect_cycles, they look for
+    repeated values with Brent's algorithm, which assumes that the iterated
+    functions are pure: iterate skips whole periods of the values, and the
+    iterate_until functions raise an exception when the values repeat
+    without the condition holding. acc_iterate_until then keeps at most
+    max_history of the values, and recomputes the others when needed."""
+
+    def __init__(self, detect_cycles=False, max_history=2**20):
+        self.detect_cycles = detect_cycles
+        self.max_history = max_history
+
+iteration = IterationOptions()
+
+def exact_key(value):
+    """A hashable key for a value, such that two values have the same key
+    only if they are indistinguishable. Unlike value_key, it tells apart
+    characters and numbers, ints and floats, and 0.0 and -0.0, and NaN has
+    a key."""
+    if is_atom(value):
+        x = value.value
+        if x.__class__ is int:
+            key = x
+        elif x.__class__ is float:
+            key = x.hex()
+        else:
+            key = (x.__class__.__name__, repr(x))
+        return key if value.type == AtomType.num else ('char', key)
+    if isinstance(value, NumArray):
+        return exact_key(from_python(value.array.tolist()))
+    return tuple(map(exact_key, value))
+
+class CycleFinder:
+    "Brent's cycle detection over the values of an iteration."
+
+    def __init__(self, value):
+        self.tortoise = exact_key(value)
+        self.power = self.period = 1
+
+    def repeats(self, value):
+        "Whether the next value repeats an earlier one; then period is the period."
+        key = exact_key(value)
+        if key == self.tortoise:
+            return True
+        if self.power == self.period:
+            self.tortoise = key
+            self.power *= 2
+            self.period = 0
+        self.period += 1
+        return False
+
+def cycle_error(cycle):
+    return Exception("The iterated values repeat with period {} "
+                     "without satisfying the condition.".format(cycle.period))
+
 def iterate(f, a, n):
+    if iteration.detect_cycles:
+        return iterate_cycles(f, a, n)
     for i in range(n):
         a = f(a)
     return a
 
+def iterate_cycles(f, a, n):
+    cycle = CycleFinder(a)
+    for steps in range(1, n+1):
+        a = f(a)
+        if steps < n and cycle.repeats(a):
+            for i in range((n - steps) % cycle.period):
+                a = f(a)
+            return a
+    return a
+
 def iterate_until(f, a, g):
+    cycle = CycleFinder(a) if iteration.detect_cycles else None
     while True:
         b = f(a)
         if is_truthy(g(a, b)):
             return b
+        if cycle is not None and cycle.repeats(b):
+            raise cycle_error(cycle)
         a = b
 
 def acc_iterate_until(f, a, g):
+    if iteration.detect_cycles:
+        return acc_iterate_cycles(f, a, g)
     out = [a]
     while True:
         b = f(a)
@@ -239,3 +832,55 @@ def acc_iterate_until(f, a, g):
         if is_truthy(g(a, b)):
             return out
         a = b
+
+def acc_iterate_cycles(f, a, g):
+    out = Trajectory(f, a, iteration.max_history)
+    cycle = CycleFinder(a)
+    while True:
+        b = f(a)
+        out.append(b)
+        if is_truthy(g(a, b)):
+            return out.checkpoints if out.stride == 1 else out
+        if cycle.repeats(b):
+            raise cycle_error(cycle)
+        a = b
+
+class Trajectory(VirtualList):
+    """The values of iterating a pure function, of which only every stride-th
+    is stored; the others are recomputed. The stride doubles whenever more
+    than max_size values would be stored."""
+
+    __slots__ = ('f', 'checkpoints', 'stride', 'length', 'max_size')
+
+    def __init__(self, f, a, max_size):
+        self.f = f
+        self.checkpoints = [a]
+        self.stride = 1
+        self.length = 1
+        self.max_size = max_size
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        if self.length % self.stride == 0:
+            if len(self.checkpoints) >= self.max_size:
+                self.checkpoints = self.checkpoints[::2]
+                self.stride *= 2
+            if self.length % self.stride == 0:
+                self.checkpoints.append(value)
+        self.length += 1
+
+    def item(self, index):
+        value = self.checkpoints[index // self.stride]
+        for i in range(index % self.stride):
+            value = self.f(value)
+        return value
+
+    def __iter__(self):
+        for (k, value) in enumerate(self.checkpoints):
+            yield value
+            for i in range(1, min(self.stride, self.length - k*self.stride)):
+                value = self.f(value)
+                yield value
+
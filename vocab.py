@@ -1,5 +1,8 @@
 from utils import *
 from print_parse import *
+from kernels import *
+from combinatorics import *
+from primes import *
 import sys
 import math
 import random
@@ -63,7 +66,9 @@ def func_right(a, b):
 
 @defun_unary('j')
 def func_input(a):
-    return parse_value(input())[0]
+    check_pure()
+    output.flush()
+    return parse_input(input())
 
 @defun_binary('j')
 @threaded_binary(0, -1)
@@ -76,16 +81,21 @@ def func_binary_input(a, b):
 
 @defun_unary('J')
 def func_raw_input(a):
+    check_pure()
+    output.flush()
     return [to_char_atom(c) for c in input()]
 
 @defun_binary('J')
 @threaded_binary(-1, 0)
 def func_binary_raw_input(a, b):
+    check_pure()
+    output.flush()
     return [to_char_atom(c) for c in sys.stdin.read(int(b))]
 
 @defun_unary('p')
 def func_print(a):
-    print(prettyprint(a))
+    check_pure()
+    output.print_value(a)
     return a
 
 @defun_binary('p')
@@ -94,7 +104,8 @@ def func_binary_print(a, b):
 
 @defun_unary('P')
 def func_matrix_print(a):
-    print(matrix_print(a))
+    check_pure()
+    output.print_value(a, matrix=True)
     return a
 
 @defun_binary('P')
@@ -102,36 +113,48 @@ def func_binary_matrix_print(a, b):
     raise Exception("Binary 'P' not implemented.")
 
 @defun_unary('+')
+@range_unary(range_abs)
+@vectorized_unary(kernel_abs)
 @threaded_unary(0)
 @mathy_unary
 def func_abs(a): return abs(a)
 
 @defun_binary('+')
+@range_binary(range_add)
+@vectorized_binary(kernel_add)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_add(a, b): return a + b
 
 @defun_unary('-')
+@range_unary(range_negate)
+@vectorized_unary(kernel_negate)
 @threaded_unary(0)
 @mathy_unary
 def func_negate(a): return -a
 
 @defun_binary('-')
+@range_binary(range_subtract)
+@vectorized_binary(kernel_subtract)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_subtract(a, b): return b - a
 
 @defun_unary('*')
+@vectorized_unary(kernel_signum)
 @threaded_unary(0)
 @mathy_unary
 def func_signum(a): return (a>0) - (a<0)
 
 @defun_binary('*')
+@range_binary(range_multiply)
+@vectorized_binary(kernel_multiply)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_multiply(a, b): return a * b
 
 @defun_unary('%')
+@vectorized_unary(kernel_reciprocal)
 @threaded_unary(0)
 @mathy_unary
 def func_reciprocal(a):
@@ -140,6 +163,7 @@ def func_reciprocal(a):
     return 1/a
 
 @defun_binary('%')
+@vectorized_binary(kernel_divide)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_divide(a, b):
@@ -150,11 +174,13 @@ def func_divide(a, b):
     return 0 # TODO: give errors?
 
 @defun_unary('|')
+@vectorized_unary(kernel_round)
 @threaded_unary(0)
 @mathy_unary
 def func_round(a): return math.floor(a + 0.5)
 
 @defun_binary('|')
+@vectorized_binary(kernel_modulus)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_modulus(a, b):
@@ -163,6 +189,7 @@ def func_modulus(a, b):
     return 0 # TODO: give errors?
 
 @defun_unary('m')
+@vectorized_unary(kernel_floor)
 @threaded_unary(0)
 @mathy_unary
 def func_floor(a): return math.floor(a)
@@ -171,6 +198,7 @@ def func_floor(a): return math.floor(a)
 def func_min(a, b): return min(a, b)
 
 @defun_unary('M')
+@vectorized_unary(kernel_ceil)
 @threaded_unary(0)
 @mathy_unary
 def func_ceil(a): return math.ceil(a)
@@ -189,17 +217,11 @@ def func_factorize(a):
     else:
         n = -n
         fact = [to_num_atom(-1)]
-    div = 2
-    while n > 1:
-        if n % div == 0:
-            n //= div
-            fact.append(to_num_atom(div))
-        else:
-            div += 1
+    fact.extend(map(to_num_atom, prime_factors(n)))
     return fact
-    
 
 @defun_binary('x')
+@vectorized_binary(kernel_xor)
 @threaded_binary(0, 0)
 @mathy_binary
 def func_xor(a, b): return a ^ b
@@ -341,17 +363,22 @@ def func_drop_root(a, b):
 @defun_unary('!')
 def func_permutations(a):
     if is_atom(a):
-        return Atom(a.type, math.factorial(int(a.value)))
+        return Atom(a.type, factorial(int(a.value)))
     else:
-        return [list(p) for p in itertools.permutations(a)]
+        return permutations(a)
 
 @defun_binary('!')
 @threaded_binary(0, -1)
 def func_binary_permutations(a, b):
     if is_atom(b):
-        return Atom(a.type, math.factorial(int(b.value)) // math.factorial(int(b.value - a.value)))
+        n = int(b.value)
+        if n >= 0:
+            k = int(b.value - a.value)
+            if k >= 0:
+                return Atom(a.type, factorial_quotient(n, k))
+        return Atom(a.type, factorial(n) // factorial(int(b.value - a.value)))
     else:
-        return [list(p) for p in itertools.permutations(b, int(a))]
+        return permutations(b, int(a))
 
 @defun_unary('c')
 @threaded_unary(0)
@@ -361,30 +388,36 @@ def func_to_char(a): return Atom(AtomType.char, a.value)
 def func_elem(a, b):
     if is_atom(b):
         b = [b]
-    return to_num_atom(int(a in b))
+    return to_num_atom(int(contains(b, a)))
 
 @defun_unary('C')
 def func_subsequences(a):
     if is_atom(a):
         return Atom(a.type, 2**a.value)
     else:
-        return [list(s)
-                for i in range(len(a)+1)
-                for s in itertools.combinations(a, i)]
+        return subsequences(a)
 
 @defun_binary('C')
-@threaded_binary(0, -1)
 def func_combinations(a, b):
+    # The rows of Pascal's triangle are kept for this call only
+    rows = {}
+    return thread_binary(lambda x, y: combinations_atom(x, y, rows), 0, -1)(a, b)
+
+def combinations_atom(a, b, rows):
     x = a.value
     if is_atom(b):
         y = b.value
         if y < x:
             return Atom(a.type, 0)
-        z = math.factorial(int(y)) // math.factorial(int(x)) // math.factorial(int(y - x))
-        return Atom(a.type, z)
+        n = int(y)
+        if n >= 0:
+            k, n_k = int(x), int(y - x)
+            if k >= 0 and n_k >= 0 and k + n_k == n:
+                return Atom(a.type, binomial(n, k, rows))
+        return Atom(a.type, factorial(n) // factorial(int(x)) // factorial(int(y - x)))
     elif b:
         x = x % len(b)
-        return [list(c) for c in itertools.combinations(b, x)]
+        return combinations(b, x)
     else:
         return []
 
@@ -398,7 +431,11 @@ def func_intersection(a, b):
         a = [a]
     if is_atom(b):
         b = [b]
-    return [x for x in a if x in b]
+    keys, b_keys = value_keys(a), value_keys(b)
+    if keys is None or b_keys is None:
+        return [x for x in a if x in b]
+    b_keys = set(b_keys)
+    return [x for (key, x) in zip(keys, a) if key in b_keys]
 
 @defun_unary('u')
 def func_uniques(a):
@@ -413,7 +450,16 @@ def func_union(a, b):
         a = [a]
     if is_atom(b):
         b = [b]
-    return a + [x for x in uniques(b) if x not in a]
+    keys, b_keys = value_keys(a), value_keys(b)
+    if keys is None or b_keys is None:
+        return a + [x for x in uniques(b) if x not in a]
+    seen = set(keys)
+    new_items = []
+    for (key, x) in zip(b_keys, b):
+        if key not in seen:
+            seen.add(key)
+            new_items.append(x)
+    return a + new_items
 
 @defun_unary('N')
 def func_not(a):
@@ -428,7 +474,11 @@ def func_without(a, b):
         a = [a]
     if is_atom(b):
         b = [b]
-    return [x for x in a if x not in b]
+    keys, b_keys = value_keys(a), value_keys(b)
+    if keys is None or b_keys is None:
+        return [x for x in a if x not in b]
+    b_keys = set(b_keys)
+    return [x for (key, x) in zip(keys, a) if key not in b_keys]
 
 @defun_unary('#')
 def func_len(a):
@@ -444,13 +494,18 @@ def func_repeat(a, b):
         b = [b]
     if is_atom(a):
         a = [a]*len(b)
-    else:
-        return [y for (x,y) in zip(a,b) for _ in range(int(x))]
+    elif vectorize:
+        result = repeat_ndarray(a, b)
+        if result is not None:
+            return from_ndarray(result)
+    return [y for (x,y) in zip(a,b) for _ in range(int(x))]
 
 @defun_unary('R')
 def func_reverse(a):
     if is_atom(a):
         return a
+    elif isinstance(a, VirtualList):
+        return a[::-1]
     else:
         return list(reversed(a))
 
@@ -491,7 +546,7 @@ def func_binary_K(a, b):
 def func_sort(a):
     if is_atom(a):
         a = [a]
-    return list(sorted(a))
+    return sort(a)
 
 @defun_binary('o')
 def func_binary_sort(a, b):
@@ -499,8 +554,8 @@ def func_binary_sort(a, b):
         a = [a]
     if is_atom(b):
         b = [b]
-    a = (a*len(b))[:len(b)]
-    return [x for (y, x) in sorted(zip(a, b))]
+    a = (a*(len(b)//len(a) + 1))[:len(b)]
+    return sort_by(a, b)
 
 @defun_unary('r')
 def func_unary_range(a):
@@ -574,6 +629,7 @@ def func_index(a, b):
 
 @defun_unary('?')
 def func_random_gen(a):
+    check_pure()
     if is_atom(a):
         x = a.value
         if type(x) == float:
@@ -596,6 +652,7 @@ def func_random_gen(a):
 @defun_binary('?')
 @threaded_binary(1, -1)
 def func_random_choice(a, b):
+    check_pure()
     if is_atom(b):
         b = func_unary_range(b)
     if is_atom(a):
@@ -770,17 +827,23 @@ def oper_binary_levels(f, g):
     if is_value(f):
         def level_map(a):
             def map_at(level):
-                return [g(x) for x in flatten(a, int(level))]
+                return map_parallel(g, list(zip(flatten(a, int(level)))))
             return thread_unary(map_at, 0)(f)
         def level_zip(a, b):
             def zip_at(level):
                 _, right, left = reshape(level, [3])
-                return [g(x, y) for (x, y) in zip(flatten(a, int(left)), flatten(b, int(left)))]
+                return map_parallel(g, list(zip(flatten(a, int(left)), flatten(b, int(left)))))
             return thread_unary(zip_at, 1)(f)
         return variadize(level_map, level_zip)
     return variadize(lambda a: oper_binary_levels(f(a), g)(a),
                      lambda a, b: oper_binary_levels(f(a, b), g)(a, b))
 
+def unwrapped(f):
+    "The function wrapped by the profiler or by a memo, if any."
+    while hasattr(f, '__wrapped__'):
+        f = f.__wrapped__
+    return f
+
 @defop_unary('/')
 def oper_join_or_fold(f):
     if is_value(f):
@@ -798,8 +861,14 @@ def oper_join_or_fold(f):
             return a
         if not a:
             return to_num_atom(0)
-        x = a[0]
-        for y in a[1:]:
+        kernel = fold_kernels.get(unwrapped(f))
+        if kernel is not None and len(a) > 1:
+            x = kernel(a)
+            if x is not None:
+                return x
+        items = iter(a)
+        x = next(items)
+        for y in items:
             x = f(x, y)
         return x
     def folded_init(a, b):
@@ -877,26 +946,25 @@ def oper_modify_indices(f, g):
             new_items = [new_items]
         if is_atom(new_items):
             new_items = [new_items]*len(indices)
-        a = full_copy(a)
+        # Copy only the lists on the paths of the indices, so that a is unchanged
+        owned = {}
         for index, item in zip(indices, new_items):
             if is_atom(a):
                 a = item
                 continue
-            focus = old_focus = a
-            old_coord = 0
             if is_atom(index):
                 index = [index]
-            for coord in index:
-                new_focus = focus[int(coord) % len(focus)]
-                old_coord = coord
-                old_focus = focus
-                if is_atom(new_focus):
-                    break
-                focus = new_focus
-            old_focus[int(old_coord) % len(old_focus)] = item
+            a = replace_at(a, index, item, owned)
         return a
     return variadize(lambda a: modify_indices(f, g, a),
                      lambda a, b: modify_indices(lambda x: f(a, x), lambda x: g(a, x), b))
 
 func_defs = {c:variadize(f) for (c,f) in func_defs.items()}
 oper_defs = {c:variadize(f) for (c,f) in oper_defs.items()}
+
+# Folds of these functions with / use a kernel
+fold_kernels = {func_defs['+']: fold_add,
+                func_defs['*']: fold_multiply,
+                func_defs['x']: fold_xor,
+                func_defs['m']: fold_min,
+                func_defs['M']: fold_max}